@@ -22,6 +22,9 @@ setup(
     ],
     python_requires=">=3.12",
     install_requires=requirements,
+    extras_require={
+        "fast": ["orjson>=3.9"],
+    },
     entry_points={
         "console_scripts": [
             "highext=src.tui:main",
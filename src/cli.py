@@ -5,10 +5,10 @@ import logging
 import sys
 from pathlib import Path
 
-from .extractor import extract_highlights_from_pdf
-from .utils import format_json_output, validate_pdf_file, validate_output_path
-from .xmind_exporter import export_to_xmind
-from .notion_exporter import export_to_notion
+from .utils import format_json_to_file, validate_pdf_file, validate_output_path
+
+# The extractor (PyMuPDF) and the exporters are imported where they are used,
+# so that --help and --version don't pay for loading them.
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -133,6 +133,8 @@ def main() -> int:
     
     try:
         # Extract highlights
+        from .extractor import extract_highlights_from_pdf
+        
         logger.info(f"Extracting highlights from: {args.input_pdf}")
         result = extract_highlights_from_pdf(args.input_pdf)
         
@@ -146,10 +148,11 @@ def main() -> int:
         
         if args.format == 'json':
             logger.info("Formatting output as JSON")
-            json_output = format_json_output(result, pretty=args.pretty)
-            output_path.write_text(json_output, encoding='utf-8')
+            format_json_to_file(result, output_path, pretty=args.pretty)
             
         elif args.format == 'xmind':
+            from .xmind_exporter import export_to_xmind
+            
             logger.info("Exporting to XMind")
             try:
                 export_to_xmind(result, str(output_path), group_by=args.group_by)
@@ -160,6 +163,8 @@ def main() -> int:
                 return 1
                 
         elif args.format == 'notion':
+            from .notion_exporter import export_to_notion
+            
             logger.info("Exporting to Notion-compatible Markdown")
             try:
                 export_to_notion(result, str(output_path), group_by=args.group_by)
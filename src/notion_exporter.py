@@ -5,14 +5,23 @@ This module provides functionality to export PDF highlights to Markdown format
 that can be imported into Notion as a note.
 """
 
+import io
 import logging
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
-from .utils import rgb_to_hex
+from .utils import highlight_hex
 
 logger = logging.getLogger(__name__)
 
+# Write buffer for the Markdown file; larger than the default to cut syscalls
+WRITE_BUFFER_SIZE = 1 << 16
+
+# Field positions in the projected highlight rows used for grouping
+_PAGE, _COLOR_NAME, _LINE = 0, 1, 2
+
 
 class NotionExporter:
     """Export PDF highlights to Notion-compatible Markdown format."""
@@ -37,10 +46,9 @@ class NotionExporter:
         output_path = Path(output_path)
         
         try:
-            markdown_content = self._generate_markdown(group_by)
-            
-            # Write to file
-            output_path.write_text(markdown_content, encoding='utf-8')
+            # Stream straight to the file instead of building the whole document first
+            with output_path.open('w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as fh:
+                self._write_markdown(fh, group_by)
             logger.info(f"Successfully exported highlights to Notion-compatible Markdown: {output_path}")
             
         except Exception as e:
@@ -49,96 +57,84 @@ class NotionExporter:
     
     def _generate_markdown(self, group_by: str) -> str:
         """Generate Markdown content from highlights data."""
-        lines = []
+        buffer = io.StringIO()
+        self._write_markdown(buffer, group_by)
+        return buffer.getvalue()
+    
+    def _write_markdown(self, fh: TextIO, group_by: str) -> None:
+        """Write Markdown content from highlights data to an open text stream."""
+        write = fh.write
         
-        # Add title
+        # Add title and metadata
         source_path = self.data.get('source_path', 'Unknown PDF')
         filename = Path(source_path).stem if source_path != 'Unknown PDF' else source_path
-        lines.append(f"# {filename}\n")
-        
-        # Add metadata
-        lines.append("## Document Information\n")
-        lines.append(f"- **Source:** {source_path}")
-        lines.append(f"- **Total Pages:** {self.data.get('total_pages', 'N/A')}")
-        lines.append(f"- **Total Highlights:** {self.data.get('total_highlights', 0)}")
-        lines.append(f"- **Extraction Date:** {self.data.get('extraction_date', 'N/A')}\n")
+        write(
+            f"# {filename}\n\n"
+            f"## Document Information\n\n"
+            f"- **Source:** {source_path}\n"
+            f"- **Total Pages:** {self.data.get('total_pages', 'N/A')}\n"
+            f"- **Total Highlights:** {self.data.get('total_highlights', 0)}\n"
+            f"- **Extraction Date:** {self.data.get('extraction_date', 'N/A')}\n\n"
+        )
         
         # Get highlights
         highlights = self.data.get('highlights', [])
         
         if not highlights:
-            lines.append("## Highlights\n")
-            lines.append("*No highlights found in this document.*\n")
-            return "\n".join(lines)
+            write("## Highlights\n\n")
+            write("*No highlights found in this document.*\n")
+            return
         
         # Add highlights section
-        lines.append("## Highlights\n")
+        write("## Highlights\n\n")
 
+        # Project each highlight once into a (page, color_name, blockquote line) row,
+        # so sorting and grouping use C-level itemgetter keys instead of dict lookups
+        rows = [
+            (
+                highlight.get('page', 0),
+                highlight.get('color_name', 'unknown'),
+                self._format_highlight(highlight),
+            )
+            for highlight in highlights
+        ]
+        lines = itemgetter(_LINE)
+        
+        # Sort once by (outer, inner) key and emit both heading levels with groupby;
+        # the sort is stable, so highlights keep their document order within a group
+        if group_by == "page":
+            rows.sort(key=itemgetter(_PAGE, _COLOR_NAME))
+        else:
+            rows.sort(key=itemgetter(_COLOR_NAME, _PAGE))
+        
+        # Blank lines separate the blockquotes; the file itself ends with a single newline
+        page_num, color_name, line = rows[-1]
+        rows[-1] = (page_num, color_name, line[:-1])
+        
         if group_by == "page":
             # Group by page, then color
-            pages = {}
-            for highlight in highlights:
-                page_num = highlight.get('page', 0)
-                if page_num not in pages:
-                    pages[page_num] = []
-                pages[page_num].append(highlight)
-            
-            for page_num in sorted(pages.keys()):
-                page_highlights = pages[page_num]
-                lines.append(f"### Page {page_num}\n")
-                
-                colors = {}
-                for highlight in page_highlights:
-                    color_name = highlight.get('color_name', 'unknown')
-                    if color_name not in colors:
-                        colors[color_name] = []
-                    colors[color_name].append(highlight)
-                
-                for color_name in sorted(colors.keys()):
-                    color_highlights = colors[color_name]
-                    lines.append(f"#### {color_name.title()}\n")
-                    for highlight in color_highlights:
-                        text = highlight.get('text', 'No text')
-                        color = highlight.get('color', [])
-                        hex_color = rgb_to_hex(color)
-                        
-                        # Add color using HTML span
-                        colored_text = f'<span style="color: {hex_color}">{text}</span>'
-                        lines.append(f"> {colored_text}\n")
+            for page_num, page_rows in groupby(rows, key=itemgetter(_PAGE)):
+                write(f"### Page {page_num}\n\n")
+                for color_name, color_rows in groupby(page_rows, key=itemgetter(_COLOR_NAME)):
+                    write(f"#### {color_name.title()}\n\n")
+                    fh.writelines(map(lines, color_rows))
 
         else: # group_by == "color"
             # Group by color, then page
-            colors = {}
-            for highlight in highlights:
-                color_name = highlight.get('color_name', 'unknown')
-                if color_name not in colors:
-                    colors[color_name] = []
-                colors[color_name].append(highlight)
-
-            for color_name in sorted(colors.keys()):
-                color_highlights = colors[color_name]
-                lines.append(f"### {color_name.title()}\n")
-
-                pages = {}
-                for highlight in color_highlights:
-                    page_num = highlight.get('page', 0)
-                    if page_num not in pages:
-                        pages[page_num] = []
-                    pages[page_num].append(highlight)
-
-                for page_num in sorted(pages.keys()):
-                    page_highlights = pages[page_num]
-                    lines.append(f"#### Page {page_num}\n")
-                    for highlight in page_highlights:
-                        text = highlight.get('text', 'No text')
-                        color = highlight.get('color', [])
-                        hex_color = rgb_to_hex(color)
-                        
-                        # Add color using HTML span
-                        colored_text = f'<span style="color: {hex_color}">{text}</span>'
-                        lines.append(f"> {colored_text}\n")
+            for color_name, color_rows in groupby(rows, key=itemgetter(_COLOR_NAME)):
+                write(f"### {color_name.title()}\n\n")
+                for page_num, page_rows in groupby(color_rows, key=itemgetter(_PAGE)):
+                    write(f"#### Page {page_num}\n\n")
+                    fh.writelines(map(lines, page_rows))
+    
+    @staticmethod
+    def _format_highlight(highlight: dict[str, Any]) -> str:
+        """Format a highlight as a colored blockquote line."""
+        text = highlight.get('text', 'No text')
+        hex_color = highlight_hex(highlight)
         
-        return "\n".join(lines)
+        # Add color using HTML span
+        return f'> <span style="color: {hex_color}">{text}</span>\n\n'
 
 
 def export_to_notion(data: dict[str, Any], output_path: str | Path, group_by: str = "page") -> None:
@@ -1,18 +1,20 @@
 from pathlib import Path
-from typing import Iterable, Any
+from typing import Iterable, Iterator, Any
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, ScrollableContainer
-from textual.widgets import Button, DirectoryTree, Footer, Header, Input, Label, Log, Checkbox, Static, Markdown, RadioSet, RadioButton
+from textual.widgets import Button, DirectoryTree, Footer, Header, Input, Label, Log, Checkbox, RichLog, Markdown, RadioSet, RadioButton
 from textual.binding import Binding
-from textual import on
+from textual import on, work
 import os
 import logging
 from datetime import datetime
+from itertools import groupby
 
 from .extractor import extract_highlights_from_pdf
-from .utils import format_json_output, rgb_to_hex
-from .xmind_exporter import export_to_xmind
-from .notion_exporter import export_to_notion, NotionExporter
+from .utils import format_json_to_file, highlight_hex
+
+# The exporters are imported where they are used, so the TUI doesn't load
+# them until an export is actually requested.
 
 class EscapableInput(Input):
     """Input widget that loses focus when Escape is pressed."""
@@ -24,95 +26,97 @@ class EscapableInput(Input):
     def action_blur(self) -> None:
         self.screen.set_focus(None)
 
+def _page_of(highlight: dict[str, Any]) -> int:
+    return highlight.get('page', 0)
+
+def _color_of(highlight: dict[str, Any]) -> str:
+    return highlight.get('color_name', 'unknown')
+
+# Sort keys read both fields directly: they run once per highlight per preview
+def _page_color_key(highlight: dict[str, Any]) -> tuple[int, str]:
+    return (highlight.get('page', 0), highlight.get('color_name', 'unknown'))
+
+def _color_page_key(highlight: dict[str, Any]) -> tuple[str, int]:
+    return (highlight.get('color_name', 'unknown'), highlight.get('page', 0))
+
+# group_by -> (sort key, outer key, outer label, inner key, inner label)
+_PREVIEW_GROUPINGS = {
+    "page": (_page_color_key, _page_of, "Page {}".format, _color_of, str.title),
+    "color": (_color_page_key, _color_of, str.title, _page_of, "Page {}".format),
+}
+
+# Rich markup for one highlight, colored with its own hex color
+_PREVIEW_LINE = "    [{0}]{1}[/{0}]\n".format
+
+def _preview_line(highlight: dict[str, Any]) -> str:
+    return _PREVIEW_LINE(highlight_hex(highlight), highlight.get('text', 'No text'))
+
 def generate_tui_preview(data: dict[str, Any], group_by: str) -> str:
     """Generate Rich-markup text for TUI preview."""
-    lines = []
-    
+    return "\n".join(iter_tui_preview(data, group_by))
+
+def iter_tui_preview(data: dict[str, Any], group_by: str) -> Iterator[str]:
+    """Yield the TUI preview one Rich-markup entry at a time."""
     # Title
     source_path = data.get('source_path', 'Unknown PDF')
     filename = Path(source_path).stem if source_path != 'Unknown PDF' else source_path
-    lines.append(f"[bold underline]{filename}[/]\n")
+    yield f"[bold underline]{filename}[/]\n"
     
     # Metadata
-    lines.append("[bold]Document Information[/]")
-    lines.append(f"- [bold]Source:[/]: {source_path}")
-    lines.append(f"- [bold]Total Pages:[/] {data.get('total_pages', 'N/A')}")
-    lines.append(f"- [bold]Total Highlights:[/] {data.get('total_highlights', 0)}")
-    lines.append(f"- [bold]Extraction Date:[/] {data.get('extraction_date', 'N/A')}\n")
+    yield "[bold]Document Information[/]"
+    yield f"- [bold]Source:[/]: {source_path}"
+    yield f"- [bold]Total Pages:[/] {data.get('total_pages', 'N/A')}"
+    yield f"- [bold]Total Highlights:[/] {data.get('total_highlights', 0)}"
+    yield f"- [bold]Extraction Date:[/] {data.get('extraction_date', 'N/A')}\n"
     
     # Highlights
     highlights = data.get('highlights', [])
     
     if not highlights:
-        lines.append("[italic]No highlights found in this document.[/]\n")
-        return "\n".join(lines)
+        yield "[italic]No highlights found in this document.[/]\n"
+        return
     
-    lines.append("[bold]Highlights[/]\n")
-
-    if group_by == "page":
-        # Group by page
-        pages = {}
-        for highlight in highlights:
-            page_num = highlight.get('page', 0)
-            if page_num not in pages:
-                pages[page_num] = []
-            pages[page_num].append(highlight)
-        
-        for page_num in sorted(pages.keys()):
-            page_highlights = pages[page_num]
-            lines.append(f"[bold]Page {page_num}[/]")
-            
-            # Group by color within page
-            colors = {}
-            for highlight in page_highlights:
-                color_name = highlight.get('color_name', 'unknown')
-                if color_name not in colors:
-                    colors[color_name] = []
-                colors[color_name].append(highlight)
-            
-            for color_name in sorted(colors.keys()):
-                color_highlights = colors[color_name]
-                lines.append(f"  [bold]{color_name.title()}[/]")
-                for highlight in color_highlights:
-                    text = highlight.get('text', 'No text')
-                    color = highlight.get('color', [])
-                    hex_color = rgb_to_hex(color)
-                    
-                    # Rich markup for color
-                    lines.append(f"    [{hex_color}]{text}[/{hex_color}]\n")
-    
-    else: # group_by == "color"
-        # Group by color
-        colors = {}
-        for highlight in highlights:
-            color_name = highlight.get('color_name', 'unknown')
-            if color_name not in colors:
-                colors[color_name] = []
-            colors[color_name].append(highlight)
-
-        for color_name in sorted(colors.keys()):
-            color_highlights = colors[color_name]
-            lines.append(f"[bold]{color_name.title()}[/]")
-
-            pages = {}
-            for highlight in color_highlights:
-                page_num = highlight.get('page', 0)
-                if page_num not in pages:
-                    pages[page_num] = []
-                pages[page_num].append(highlight)
-
-            for page_num in sorted(pages.keys()):
-                page_highlights = pages[page_num]
-                lines.append(f"  [bold]Page {page_num}[/]")
-                for highlight in page_highlights:
-                    text = highlight.get('text', 'No text')
-                    color = highlight.get('color', [])
-                    hex_color = rgb_to_hex(color)
-                    
-                    # Rich markup for color
-                    lines.append(f"    [{hex_color}]{text}[/{hex_color}]\n")
+    yield "[bold]Highlights[/]\n"
+
+    sort_key, outer_key, outer_label, inner_key, inner_label = _PREVIEW_GROUPINGS.get(
+        group_by, _PREVIEW_GROUPINGS["color"]
+    )
     
-    return "\n".join(lines)
+    # Sort once (stable, so document order is kept) and group outer -> inner
+    ordered = sorted(highlights, key=sort_key)
+    for outer, outer_highlights in groupby(ordered, key=outer_key):
+        yield f"[bold]{outer_label(outer)}[/]"
+        
+        for inner, inner_highlights in groupby(outer_highlights, key=inner_key):
+            yield f"  [bold]{inner_label(inner)}[/]"
+            yield from map(_preview_line, inner_highlights)
+
+
+def _scan_dir_flags(directory: Path) -> dict[str, bool]:
+    """Map entry names in a directory to whether they are directories."""
+    flags = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    flags[entry.name] = entry.is_dir()
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return flags
+
+
+def _is_listed(path: Path, dir_flags: dict[str, bool]) -> bool:
+    """Whether the file browser shows an entry: visible directories and PDFs."""
+    name = path.name
+    if name[:1] == ".":
+        return False
+    # Cheapest test first; a PDF needs no directory lookup at all
+    if name[-4:].lower() == ".pdf":
+        return True
+    is_dir = dir_flags.get(name)
+    return path.is_dir() if is_dir is None else is_dir
 
 
 class FilteredDirectoryTree(DirectoryTree):
@@ -134,45 +138,20 @@ class FilteredDirectoryTree(DirectoryTree):
         return res
 
     def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
-        import inspect
-        is_root = False
+        paths_list = list(paths)
+        if not paths_list:
+            return []
         
-        # Check stack to see if we are loading the root directory
-        frame = inspect.currentframe()
-        try:
-            caller = frame.f_back
-            while caller:
-                if caller.f_code.co_name == '_load_directory':
-                    # Check for 'node' argument first (modern Textual)
-                    node_arg = caller.f_locals.get('node')
-                    if node_arg and hasattr(node_arg, 'data') and hasattr(node_arg.data, 'path'):
-                         path_obj = node_arg.data.path
-                         if path_obj and hasattr(path_obj, 'absolute'):
-                            if path_obj.absolute() == self.path.absolute():
-                                is_root = True
-                    
-                    # Fallback check for 'path' argument (older Textual or if signature differs)
-                    if not is_root:
-                        path_arg = caller.f_locals.get('path')
-                        if path_arg and hasattr(path_arg, 'absolute'):
-                            if path_arg.absolute() == self.path.absolute():
-                                is_root = True
-                    
-                    break
-                caller = caller.f_back
-        except Exception:
-            pass
-        finally:
-            del frame
+        # Entries share one parent: it identifies the root listing, and a
+        # single scandir answers is_dir for all of them
+        parent = paths_list[0].parent
+        filtered = [self.path / ".."] if parent.absolute() == self.path.absolute() else []
+        dir_flags = _scan_dir_flags(parent)
+        filtered.extend(path for path in paths_list if _is_listed(path, dir_flags))
+        return filtered
 
-        paths_list = list(paths)
-        if is_root:
-            paths_list.insert(0, self.path / "..")
-                
-        return [
-            path for path in paths_list 
-            if (path.name == ".." or not path.name.startswith(".")) and (path.is_dir() or path.suffix.lower() == ".pdf")
-        ]
+# Delay before queued log messages are written; messages queued meanwhile render together
+LOG_FLUSH_INTERVAL = 0.05
 
 class PDFExtractorApp(App):
     """Textual TUI for Highext."""
@@ -200,7 +179,10 @@ class PDFExtractorApp(App):
     #right-pane {
         height: 100%;
         padding: 1;
-        overflow-y: scroll;
+    }
+    
+    #preview-log {
+        height: 1fr;
     }
     
     .box {
@@ -239,6 +221,7 @@ class PDFExtractorApp(App):
     def __init__(self):
         super().__init__()
         self.selected_file: Path | None = None
+        self._log_buffer: list[str] = []
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -272,42 +255,70 @@ class PDFExtractorApp(App):
         # Right Pane: Highlights Preview
         with Vertical(id="right-pane"):
             yield Label("Highlights Preview")
-            yield Static("*Select a PDF and click Extract to view highlights*", id="preview-static", markup=True)
+            # RichLog only renders the rows in view, unlike one big Static
+            yield RichLog(id="preview-log", markup=True, wrap=True, auto_scroll=False, min_width=1)
 
         yield Footer()
 
+    def on_mount(self) -> None:
+        # Look widgets up once; handlers below use these references
+        self._file_tree = self.query_one(FilteredDirectoryTree)
+        self._json_cb = self.query_one("#json-cb", Checkbox)
+        self._xmind_cb = self.query_one("#xmind-cb", Checkbox)
+        self._notion_cb = self.query_one("#notion-cb", Checkbox)
+        self._output_name = self.query_one("#output-name", Input)
+        self._group_page = self.query_one("#group-page", RadioButton)
+        self._extract_btn = self.query_one("#extract-btn", Button)
+        self._log_widget = self.query_one("#log", Log)
+        self._preview_log = self.query_one("#preview-log", RichLog)
+        
+        self.show_preview(["*Select a PDF and click Extract to view highlights*"])
+
+    def show_preview(self, lines: Iterable[str]) -> None:
+        """Replace the preview pane contents with the given markup lines."""
+        with self.batch_update():
+            self._preview_log.clear()
+            for line in lines:
+                self._preview_log.write(line)
+
     @on(DirectoryTree.FileSelected)
     def on_directory_tree_file_selected(self, event: DirectoryTree.FileSelected) -> None:
         """Called when a file is selected in the directory tree."""
         if event.path.suffix.lower() == ".pdf":
             self.selected_file = event.path
-            self.query_one("#extract-btn").disabled = False
+            self._extract_btn.disabled = False
             self.log_message(f"Selected file: {event.path.name}")
         else:
             self.selected_file = None
-            self.query_one("#extract-btn").disabled = True
+            self._extract_btn.disabled = True
             self.log_message(f"Ignored non-PDF file: {event.path.name}")
 
     def action_refresh_tree(self) -> None:
         """Refresh the directory tree."""
-        tree = self.query_one(FilteredDirectoryTree)
-        tree.reload()
+        self._file_tree.reload()
 
     def log_message(self, message: str) -> None:
-        """Write a message to the on-screen log."""
-        log = self.query_one(Log)
+        """Queue a message for the on-screen log."""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log.write_line(f"[{timestamp}] {message}")
+        # Only the first message of a batch schedules a flush; no timer runs while idle
+        if not self._log_buffer:
+            self.set_timer(LOG_FLUSH_INTERVAL, self._flush_log)
+        self._log_buffer.append(f"[{timestamp}] {message}")
+
+    def _flush_log(self) -> None:
+        """Write queued log messages in one batch."""
+        if self._log_buffer:
+            self._log_widget.write_lines(self._log_buffer)
+            self._log_buffer.clear()
 
     @on(DirectoryTree.DirectorySelected)
     def on_directory_selected(self, event: DirectoryTree.DirectorySelected) -> None:
         event.stop()
-        tree = self.query_one(FilteredDirectoryTree)
         
         if event.path.name == "..":
-            tree.path = tree.path.parent
+            self._file_tree.path = self._file_tree.path.parent
         else:
-            tree.path = event.path
+            self._file_tree.path = event.path
 
     @on(Button.Pressed, "#extract-btn")
     def run_extraction(self) -> None:
@@ -315,11 +326,11 @@ class PDFExtractorApp(App):
             self.log_message("Error: No file selected.")
             return
 
-        json_enabled = self.query_one("#json-cb").value
-        xmind_enabled = self.query_one("#xmind-cb").value
-        notion_enabled = self.query_one("#notion-cb").value
-        custom_name = self.query_one("#output-name").value
-        group_by = "page" if self.query_one("#group-page").value else "color"
+        json_enabled = self._json_cb.value
+        xmind_enabled = self._xmind_cb.value
+        notion_enabled = self._notion_cb.value
+        custom_name = self._output_name.value
+        group_by = "page" if self._group_page.value else "color"
 
         # Only check if no export is selected AND we don't want to just preview
         # But for now, let's allow extraction just for preview even if no export is selected
@@ -327,55 +338,81 @@ class PDFExtractorApp(App):
         
         self.log_message(f"Starting extraction for: {self.selected_file.name}")
         
+        # Widgets are read here on the event loop; the slow part runs in a worker
+        base_name = custom_name if custom_name else self.selected_file.stem
+        self._extract_btn.disabled = True
+        self._extract_and_export(
+            self.selected_file, base_name, group_by, json_enabled, xmind_enabled, notion_enabled
+        )
+
+    @work(thread=True, exclusive=True, group="extraction")
+    def _extract_and_export(
+        self,
+        pdf_file: Path,
+        base_name: str,
+        group_by: str,
+        json_enabled: bool,
+        xmind_enabled: bool,
+        notion_enabled: bool
+    ) -> None:
+        """Extract highlights and write the selected exports off the event loop."""
+        def log(message: str) -> None:
+            self.call_from_thread(self.log_message, message)
+        
         try:
             # Extract highlights
-            result = extract_highlights_from_pdf(str(self.selected_file))
+            result = extract_highlights_from_pdf(str(pdf_file))
             
             if result['total_highlights'] == 0:
-                self.log_message("Warning: No highlights found in the PDF.")
-                self.query_one("#preview-static").update("*No highlights found.*")
+                log("Warning: No highlights found in the PDF.")
+                self.call_from_thread(self.show_preview, ["*No highlights found.*"])
             else:
-                self.log_message(f"Found {result['total_highlights']} highlights.")
+                log(f"Found {result['total_highlights']} highlights.")
                 
                 # Update Preview
                 try:
-                    preview_content = generate_tui_preview(result, group_by=group_by)
-                    self.query_one("#preview-static").update(preview_content)
+                    preview_lines = list(iter_tui_preview(result, group_by=group_by))
+                    self.call_from_thread(self.show_preview, preview_lines)
                 except Exception as e:
-                    self.log_message(f"Error generating preview: {e}")
-
-            base_name = custom_name if custom_name else self.selected_file.stem
+                    log(f"Error generating preview: {e}")
 
             # JSON Export
             if json_enabled:
-                output_path = self.selected_file.parent / f"{base_name}.json"
-                json_output = format_json_output(result, pretty=True, group_by=group_by)
-                output_path.write_text(json_output, encoding='utf-8')
-                self.log_message(f"✓ JSON saved to: {output_path.name}")
+                output_path = pdf_file.parent / f"{base_name}.json"
+                format_json_to_file(result, output_path, pretty=True, group_by=group_by)
+                log(f"✓ JSON saved to: {output_path.name}")
 
             # XMind Export
             if xmind_enabled:
-                output_path = self.selected_file.parent / f"{base_name}.xmind"
+                output_path = pdf_file.parent / f"{base_name}.xmind"
                 try:
+                    from .xmind_exporter import export_to_xmind
                     export_to_xmind(result, str(output_path), group_by=group_by)
-                    self.log_message(f"✓ XMind saved to: {output_path.name}")
+                    log(f"✓ XMind saved to: {output_path.name}")
                 except Exception as e:
-                    self.log_message(f"Error exporting XMind: {e}")
+                    log(f"Error exporting XMind: {e}")
 
             # Notion Export
             if notion_enabled:
-                output_path = self.selected_file.parent / f"{base_name}.md"
+                output_path = pdf_file.parent / f"{base_name}.md"
                 try:
+                    from .notion_exporter import export_to_notion
                     export_to_notion(result, str(output_path), group_by=group_by)
-                    self.log_message(f"✓ Notion (MD) saved to: {output_path.name}")
+                    log(f"✓ Notion (MD) saved to: {output_path.name}")
                 except Exception as e:
-                    self.log_message(f"Error exporting Notion: {e}")
+                    log(f"Error exporting Notion: {e}")
 
-            self.log_message("Done!")
+            log("Done!")
 
         except Exception as e:
-            self.log_message(f"Critical Error: {str(e)}")
-            self.query_one("#preview-static").update(f"Error: {str(e)}")
+            log(f"Critical Error: {str(e)}")
+            self.call_from_thread(self.show_preview, [f"Error: {str(e)}"])
+        
+        finally:
+            self.call_from_thread(self._extraction_finished)
+
+    def _extraction_finished(self) -> None:
+        self._extract_btn.disabled = self.selected_file is None
 
 def main():
     app = PDFExtractorApp()
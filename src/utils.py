@@ -2,8 +2,72 @@
 
 import json
 import os
+import stat
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Sequence
+
+try:
+    import orjson  # Optional accelerator (pip install highext[fast])
+except ImportError:
+    orjson = None
+
+
+# Expanded color map with common PDF highlight colors and standard colors
+# Values are in 0.0-1.0 range
+_KNOWN_COLORS = {
+    # Standard PDF/Office Highlight Colors
+    "Yellow": (1.0, 1.0, 0.0),      # Standard Yellow
+    "Red": (1.0, 0.0, 0.0),         # Standard Red
+    "Green": (0.0, 1.0, 0.0),       # Standard Green
+    "Blue": (0.0, 0.0, 1.0),        # Standard Blue
+    "Orange": (1.0, 0.5, 0.0),      # Standard Orange
+    "Magenta": (1.0, 0.0, 1.0),     # Standard Magenta
+    "Cyan": (0.0, 1.0, 1.0),        # Standard Cyan
+    "Purple": (0.5, 0.0, 0.5),      # Standard Purple
+    "Pink": (1.0, 0.75, 0.8),       # Standard Pink
+    
+    # Soft/Pastel Variants (Common in Mac Preview/PDF Readers)
+    "Light Yellow": (1.0, 0.98, 0.6),
+    "Light Green": (0.6, 1.0, 0.6),
+    "Light Blue": (0.6, 0.8, 1.0),
+    "Light Pink": (1.0, 0.7, 0.7),
+    "Light Purple": (0.8, 0.6, 0.8),
+    "Light Orange": (1.0, 0.8, 0.4),
+    "Light Gray": (0.9, 0.9, 0.9),
+    
+    # Additional Common Colors
+    "Dark Red": (0.5, 0.0, 0.0),
+    "Dark Green": (0.0, 0.5, 0.0),
+    "Dark Blue": (0.0, 0.0, 0.5),
+    "Gray": (0.5, 0.5, 0.5),
+    "Black": (0.0, 0.0, 0.0),
+    "White": (1.0, 1.0, 1.0),
+    "Teal": (0.0, 0.5, 0.5),
+    "Olive": (0.5, 0.5, 0.0),
+    "Maroon": (0.5, 0.0, 0.0),
+    "Navy": (0.0, 0.0, 0.5),
+    "Lime": (0.0, 1.0, 0.0),      # Same as Green, but good to have if slightly off
+    "Gold": (1.0, 0.84, 0.0),
+    "Salmon": (0.98, 0.5, 0.45),
+    "Sky Blue": (0.53, 0.81, 0.92),
+}
+
+_GRAYSCALE_NAMES = frozenset({"Gray", "Light Gray", "Black", "White"})
+
+# Flat (name, r, g, b) candidate rows; chromatic inputs never match grayscale targets
+_ALL_CANDIDATES = tuple((name, r, g, b) for name, (r, g, b) in _KNOWN_COLORS.items())
+_CHROMATIC_CANDIDATES = tuple(c for c in _ALL_CANDIDATES if c[0] not in _GRAYSCALE_NAMES)
+
+# Minimum channel spread for a color to count as "having color"
+CHROMATIC_SATURATION = 0.15
+
+# Distinct colors remembered by the color conversion caches
+COLOR_CACHE_SIZE = 256
+
+# json.dump emits many small chunks, so batch them before they reach the OS
+JSON_WRITE_BUFFER_SIZE = 1 << 16
 
 
 def rgb_to_color_name(rgb: tuple[float, float, float]) -> str:
@@ -18,75 +82,72 @@ def rgb_to_color_name(rgb: tuple[float, float, float]) -> str:
     """
     if not rgb or len(rgb) < 3:
         return "unknown"
+    
+    # Highlights reuse a handful of colors, so cache on the (hashable) components.
+    # Keys are the exact floats: quantizing first would cost more per call than
+    # a hit saves and could move colors that sit near a palette boundary.
+    r, g, b = rgb[:3]
+    return _closest_color_name(r, g, b)
 
-    # Expanded color map with common PDF highlight colors and standard colors
-    # Values are in 0.0-1.0 range
-    known_colors = {
-        # Standard PDF/Office Highlight Colors
-        "Yellow": (1.0, 1.0, 0.0),      # Standard Yellow
-        "Red": (1.0, 0.0, 0.0),         # Standard Red
-        "Green": (0.0, 1.0, 0.0),       # Standard Green
-        "Blue": (0.0, 0.0, 1.0),        # Standard Blue
-        "Orange": (1.0, 0.5, 0.0),      # Standard Orange
-        "Magenta": (1.0, 0.0, 1.0),     # Standard Magenta
-        "Cyan": (0.0, 1.0, 1.0),        # Standard Cyan
-        "Purple": (0.5, 0.0, 0.5),      # Standard Purple
-        "Pink": (1.0, 0.75, 0.8),       # Standard Pink
-        
-        # Soft/Pastel Variants (Common in Mac Preview/PDF Readers)
-        "Light Yellow": (1.0, 0.98, 0.6),
-        "Light Green": (0.6, 1.0, 0.6),
-        "Light Blue": (0.6, 0.8, 1.0),
-        "Light Pink": (1.0, 0.7, 0.7),
-        "Light Purple": (0.8, 0.6, 0.8),
-        "Light Orange": (1.0, 0.8, 0.4),
-        "Light Gray": (0.9, 0.9, 0.9),
+
+def highlight_hex(highlight: dict[str, Any]) -> str:
+    """
+    Get a highlight's HEX color.
+    
+    Uses the ``color_hex`` stored at extraction time, falling back to
+    converting ``color`` for data that predates it.
+    
+    Args:
+        highlight: Highlight dictionary
         
-        # Additional Common Colors
-        "Dark Red": (0.5, 0.0, 0.0),
-        "Dark Green": (0.0, 0.5, 0.0),
-        "Dark Blue": (0.0, 0.0, 0.5),
-        "Gray": (0.5, 0.5, 0.5),
-        "Black": (0.0, 0.0, 0.0),
-        "White": (1.0, 1.0, 1.0),
-        "Teal": (0.0, 0.5, 0.5),
-        "Olive": (0.5, 0.5, 0.0),
-        "Maroon": (0.5, 0.0, 0.0),
-        "Navy": (0.0, 0.0, 0.5),
-        "Lime": (0.0, 1.0, 0.0),      # Same as Green, but good to have if slightly off
-        "Gold": (1.0, 0.84, 0.0),
-        "Salmon": (0.98, 0.5, 0.45),
-        "Sky Blue": (0.53, 0.81, 0.92),
-    }
+    Returns:
+        HEX color string (e.g. "#FF0000")
+    """
+    return highlight.get('color_hex') or rgb_to_hex(highlight.get('color', ()))
 
-    r, g, b = rgb[:3]
+
+def rgb_to_color_names(rgbs: Iterable[Sequence[float]]) -> list[str]:
+    """
+    Convert many RGB values to color names in one call.
     
-    # Check saturation (difference between max and min channel)
+    Each distinct color is classified once; repeats are answered from a
+    local table without going back through rgb_to_color_name.
+    
+    Args:
+        rgbs: Iterable of RGB values (0.0 to 1.0 range)
+        
+    Returns:
+        Color names, in input order
+    """
+    names: dict[tuple[float, ...], str] = {}
+    result = []
+    for rgb in rgbs:
+        key = tuple(rgb[:3]) if rgb else ()
+        name = names.get(key)
+        if name is None:
+            name = names[key] = rgb_to_color_name(key)
+        result.append(name)
+    return result
+
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _closest_color_name(r: float, g: float, b: float) -> str:
+    """Find the closest known color name for the given RGB components."""
     # If the color has significant saturation, avoid matching with grayscale colors
     saturation = max(r, g, b) - min(r, g, b)
-    is_chromatic = saturation > 0.15  # Threshold for "having color"
-
-    # Find closest color using Euclidean distance
+    candidates = _CHROMATIC_CANDIDATES if saturation > CHROMATIC_SATURATION else _ALL_CANDIDATES
+    
+    # Find closest color using squared Euclidean distance (no sqrt needed to compare)
     min_dist = float('inf')
     closest_name = "Gray"  # Default fallback
     
-    grayscale_names = {"Gray", "Light Gray", "Black", "White"}
-    
-    for name, (cr, cg, cb) in known_colors.items():
-        # If input is chromatic, skip grayscale targets unless they are the only option
-        # (which won't happen as we have plenty of colors)
-        if is_chromatic and name in grayscale_names:
-            continue
-            
-        # Calculate squared Euclidean distance (no need for sqrt for comparison)
+    for name, cr, cg, cb in candidates:
         dist = (r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2
-        
         if dist < min_dist:
+            if dist == 0.0:
+                return name  # Exact palette match, nothing can be closer
             min_dist = dist
             closest_name = name
-            
-    # If distance is very small, return the name directly
-    # Otherwise, we could format it, but sticking to the closest name is usually best for categorization
     
     return closest_name
 
@@ -104,7 +165,12 @@ def rgb_to_hex(rgb: list[float] | tuple[float, ...]) -> str:
     if not rgb or len(rgb) < 3:
         return "#FFFFFF"
     r, g, b = rgb[:3]
-    
+    return _rgb_components_to_hex(r, g, b)
+
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _rgb_components_to_hex(r: float, g: float, b: float) -> str:
+    """Convert RGB components to a HEX string."""
     # Handle 0-255 scale if detected
     if r > 1.0 or g > 1.0 or b > 1.0:
         r /= 255.0
@@ -116,7 +182,7 @@ def rgb_to_hex(rgb: list[float] | tuple[float, ...]) -> str:
     g = max(0.0, min(1.0, g))
     b = max(0.0, min(1.0, b))
     
-    return f"#{int(r*255):02X}{int(g*255):02X}{int(b*255):02X}"
+    return "#" + bytes((int(r * 255), int(g * 255), int(b * 255))).hex().upper()
 
 
 def group_highlights(highlights: list[dict[str, Any]], group_by: str) -> dict[str, list[dict[str, Any]]]:
@@ -130,20 +196,46 @@ def group_highlights(highlights: list[dict[str, Any]], group_by: str) -> dict[st
     Returns:
         Dictionary mapping keys (page number or color) to lists of highlights
     """
-    grouped = {}
+    grouped = defaultdict(list)
     if group_by == "page":
         for h in highlights:
-            key = str(h.get('page', 0))
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(h)
+            grouped[str(h.get('page', 0))].append(h)
     elif group_by == "color":
         for h in highlights:
-            key = h.get('color_name', 'unknown')
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(h)
-    return grouped
+            grouped[h.get('color_name', 'unknown')].append(h)
+    return dict(grouped)
+
+
+def _json_output_data(data: dict[str, Any], group_by: str | None) -> dict[str, Any]:
+    """
+    Add the optional grouped view of the highlights to the output data.
+    
+    The caller's dictionary is returned as-is when there is nothing to add,
+    and is never modified.
+    """
+    if not group_by or 'highlights' not in data:
+        return data
+    
+    return {**data, 'grouped_highlights': group_highlights(data['highlights'], group_by)}
+
+
+def _stdlib_dumps(output_data: dict[str, Any], pretty: bool) -> str:
+    """Serialize with the stdlib json module, indented by two spaces when pretty."""
+    return json.dumps(output_data, indent=2 if pretty else None, ensure_ascii=False)
+
+
+def _orjson_dumps(output_data: dict[str, Any], pretty: bool) -> bytes:
+    """
+    Serialize with orjson, indented by two spaces when pretty.
+    
+    Non-str keys are stringified like the stdlib does. Anything orjson still
+    rejects (e.g. ints wider than 64 bits) falls back to the stdlib encoder.
+    """
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+    try:
+        return orjson.dumps(output_data, option=option)
+    except TypeError:
+        return _stdlib_dumps(output_data, pretty).encode('utf-8')
 
 
 def format_json_output(data: dict[str, Any], pretty: bool = False, group_by: str | None = None) -> str:
@@ -158,14 +250,59 @@ def format_json_output(data: dict[str, Any], pretty: bool = False, group_by: str
     Returns:
         JSON formatted string
     """
-    output_data = data.copy()
+    output_data = _json_output_data(data, group_by)
+    
+    if orjson is not None:
+        return _orjson_dumps(output_data, pretty).decode('utf-8')
+        
+    return _stdlib_dumps(output_data, pretty)
+
+
+def format_json_bytes(data: dict[str, Any], pretty: bool = False, group_by: str | None = None) -> bytes:
+    """
+    Format data as UTF-8 encoded JSON, ready to be written to a file.
+    
+    With orjson this skips the intermediate str entirely.
     
-    if group_by and 'highlights' in output_data:
-        output_data['grouped_highlights'] = group_highlights(output_data['highlights'], group_by)
+    Args:
+        data: Dictionary to format
+        pretty: Whether to pretty-print the JSON
+        group_by: Optional grouping ('page' or 'color')
         
-    if pretty:
-        return json.dumps(output_data, indent=2, ensure_ascii=False)
-    return json.dumps(output_data, ensure_ascii=False)
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return _orjson_dumps(_json_output_data(data, group_by), pretty)
+    
+    return format_json_output(data, pretty=pretty, group_by=group_by).encode('utf-8')
+
+
+def format_json_to_file(
+    data: dict[str, Any],
+    path: str | Path,
+    pretty: bool = False,
+    group_by: str | None = None
+) -> None:
+    """
+    Write data as UTF-8 encoded JSON to a file.
+    
+    Without orjson the document is streamed with ``json.dump`` instead of
+    being built as one string first.
+    
+    Args:
+        data: Dictionary to format
+        path: Destination file path
+        pretty: Whether to pretty-print the JSON
+        group_by: Optional grouping ('page' or 'color')
+    """
+    if orjson is not None:
+        Path(path).write_bytes(format_json_bytes(data, pretty=pretty, group_by=group_by))
+        return
+    
+    output_data = _json_output_data(data, group_by)
+    with open(path, 'w', encoding='utf-8', buffering=JSON_WRITE_BUFFER_SIZE) as fh:
+        json.dump(output_data, fh, indent=2 if pretty else None, ensure_ascii=False)
 
 
 def validate_pdf_file(path: str) -> tuple[bool, str]:
@@ -178,15 +315,20 @@ def validate_pdf_file(path: str) -> tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    file_path = Path(path)
-    
-    if not file_path.exists():
+    # One stat answers both "exists" and "is a regular file"
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
         return False, f"File not found: {path}"
+    except OSError as e:
+        return False, f"Cannot access file: {path} ({e.strerror or e})"
+    except ValueError as e:
+        return False, f"Invalid file path: {path} ({e})"
     
-    if not file_path.is_file():
+    if not stat.S_ISREG(mode):
         return False, f"Path is not a file: {path}"
     
-    if file_path.suffix.lower() != '.pdf':
+    if os.path.splitext(path)[1].lower() != '.pdf':
         return False, f"File is not a PDF: {path}"
     
     if not os.access(path, os.R_OK):
@@ -207,13 +349,11 @@ def validate_output_path(path: str) -> tuple[bool, str]:
     """
     output_path = Path(path)
     
-    # Check if parent directory exists
-    parent_dir = output_path.parent
-    if not parent_dir.exists():
-        try:
-            parent_dir.mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            return False, f"Cannot create output directory: {e}"
+    # Make sure the parent directory exists; mkdir alone answers that in one call
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        return False, f"Cannot create output directory: {e}"
     
     # Check if file already exists and is writable
     if output_path.exists() and not os.access(path, os.W_OK):
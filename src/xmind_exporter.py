@@ -2,61 +2,171 @@
 
 import json
 import logging
-import uuid
+import os
 import zipfile
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 
-from .utils import rgb_to_hex
+try:
+    import orjson  # Optional accelerator (pip install highext[fast])
+except ImportError:
+    orjson = None
+
+from .utils import highlight_hex
 
 logger = logging.getLogger(__name__)
 
+# Topic IDs are 8 random bytes (16 hex digits), fetched this many at a time
+ID_BYTES = 8
+ID_POOL_SIZE = 512
+
+# Mindmap JSON repeats the same keys for every topic, so the fastest deflate
+# level compresses it almost as well as the default (6)
+DEFAULT_COMPRESSLEVEL = 1
+
+_TOPIC_SHAPE = "org.xmind.topicShape.roundedRect"
+
+# Shared default for missing sequences, so lookups don't allocate a new list
+_EMPTY: tuple = ()
+
+# XMind doesn't need whitespace in its JSON; it only makes the archive bigger
+_COMPACT_SEPARATORS = (',', ':')
+
+_CREATOR = {"name": "PDF Highlight Extractor", "version": "1.0.0"}
+_MANIFEST = {"file-entries": {"content.json": {}, "metadata.json": {}}}
+
+# Compact manifest/metadata never change between exports apart from the
+# "created" value, which is spliced in between the metadata prefix and suffix
+_MANIFEST_BYTES = json.dumps(_MANIFEST, separators=_COMPACT_SEPARATORS).encode('utf-8')
+_METADATA_PREFIX = (
+    b'{"creator":' + json.dumps(_CREATOR, separators=_COMPACT_SEPARATORS).encode('utf-8')
+    + b',"created":'
+)
+_METADATA_SUFFIX = b'}'
+
+
+def _page_of(highlight: dict[str, Any]) -> int:
+    return highlight.get('page', 0)
+
+
+def _color_of(highlight: dict[str, Any]) -> str:
+    return highlight.get('color_name', 'unknown')
+
+
+def _group_style(hex_color: str) -> dict[str, Any]:
+    """Style for a color group topic: filled and outlined in the group's color."""
+    return {
+        "properties": {
+            "svg:fill": hex_color,
+            "fill": hex_color,
+            "shape-class": _TOPIC_SHAPE,
+            "border-line-color": hex_color,
+            "line-color": hex_color
+        }
+    }
+
+
+def _highlight_style(hex_color: str) -> dict[str, Any]:
+    """Style for a single highlight topic."""
+    return {
+        "properties": {
+            "svg:fill": hex_color,
+            "shape-class": _TOPIC_SHAPE,
+            "border-line-color": hex_color
+        }
+    }
+
+
+def _bucket(
+    items: Iterable[dict[str, Any]],
+    key: Callable[[dict[str, Any]], Any]
+) -> dict[Any, list[dict[str, Any]]]:
+    """Group items by key in a single pass, keeping their order within each group."""
+    buckets = defaultdict(list)
+    for item in items:
+        buckets[key(item)].append(item)
+    return buckets
+
 
 class XMindExporter:
     """Export PDF highlights to XMind mindmap format."""
     
-    def __init__(self, highlights_data: dict[str, Any]):
+    # Compression for content.json (tests that only round-trip JSON use ZIP_STORED)
+    _compression = zipfile.ZIP_DEFLATED
+    
+    def __init__(self, highlights_data: dict[str, Any], pretty: bool = False):
         """
         Initialize the exporter.
         
         Args:
             highlights_data: Dictionary containing extraction results
+            pretty: Indent the JSON inside the archive (for debugging)
         """
         self.data = highlights_data
+        self.pretty = pretty
+        self._id_pool = b""
+        self._id_pos = 0
+        self._color_titles: dict[str, str] = {}
 
     def _generate_id(self) -> str:
-        """Generate a unique ID."""
-        return str(uuid.uuid4()).replace('-', '')[:16]
+        """Generate a unique 16 hex digit ID."""
+        # Slice IDs out of one urandom() call instead of building a UUID per topic
+        pos = self._id_pos
+        if pos >= len(self._id_pool):
+            self._id_pool = os.urandom(ID_BYTES * ID_POOL_SIZE)
+            pos = 0
+        self._id_pos = pos + ID_BYTES
+        return self._id_pool[pos:pos + ID_BYTES].hex()
 
-    def _get_timestamp(self) -> str:
-        """Get current timestamp in milliseconds."""
-        return str(int(datetime.now().timestamp() * 1000))
+    def _color_title(self, color_name: str) -> str:
+        """Title-case a color name, once per name for the life of the exporter."""
+        title = self._color_titles.get(color_name)
+        if title is None:
+            title = self._color_titles[color_name] = color_name.title()
+        return title
 
-    def export(self, output_path: str, group_by: str = "page") -> None:
+    def export(
+        self,
+        output_path: str | os.PathLike | BinaryIO,
+        group_by: str = "page",
+        compresslevel: int = DEFAULT_COMPRESSLEVEL
+    ) -> None:
         """
         Export highlights to XMind format.
         
         Args:
-            output_path: Path to save the XMind file
+            output_path: Path to save the XMind file, or a writable binary
+                stream (e.g. ``io.BytesIO``) to write the archive into
             group_by: How to organize highlights ("page" or "color")
+            compresslevel: Deflate level, 1 (fastest) to 9 (smallest)
         """
         logger.info(f"Creating XMind mindmap (JSON): {output_path}")
         
         if group_by not in ["page", "color"]:
             raise ValueError(f"Invalid group_by option: {group_by}")
         
-        # Create content
-        content = self._create_content(group_by)
-        manifest = self._create_manifest()
-        metadata = self._create_metadata()
+        # Read the clock at most once per export
+        created = self._created()
+        if self.pretty:
+            manifest = self._encode(self._create_manifest())
+            metadata = self._encode(self._create_metadata(created))
+        else:
+            manifest = _MANIFEST_BYTES
+            metadata = _METADATA_PREFIX + self._encode(created) + _METADATA_SUFFIX
         
         # Write to ZIP file
         try:
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                zf.writestr('content.json', json.dumps(content, indent=2))
-                zf.writestr('manifest.json', json.dumps(manifest, indent=2))
-                zf.writestr('metadata.json', json.dumps(metadata, indent=2))
+            with zipfile.ZipFile(
+                output_path, 'w', self._compression, compresslevel=compresslevel
+            ) as zf:
+                # Stream content.json so a large sheet is never built as one string
+                with zf.open('content.json', 'w', force_zip64=True) as fp:
+                    self._write_content(fp, group_by)
+                # Deflating a couple hundred bytes saves nothing, so store them as-is
+                zf.writestr('manifest.json', manifest, compress_type=zipfile.ZIP_STORED)
+                zf.writestr('metadata.json', metadata, compress_type=zipfile.ZIP_STORED)
             
             logger.info(f"XMind file saved: {output_path}")
         except Exception as e:
@@ -65,180 +175,139 @@ class XMindExporter:
 
     def _create_content(self, group_by: str) -> list[dict[str, Any]]:
         """Create the content structure."""
+        sheet, root_topic = self._create_sheet()
+        root_topic["children"] = {"attached": list(self._iter_topics(group_by))}
+        sheet["rootTopic"] = root_topic
+        return [sheet]
+
+    def _write_content(self, fp: BinaryIO, group_by: str) -> None:
+        """
+        Stream the content structure as UTF-8 JSON.
+        
+        The sheet and root topic are written around the top-level topics,
+        which are serialized one at a time, so only one group is in memory.
         
+        Args:
+            fp: Binary stream to write to
+            group_by: How to organize highlights ("page" or "color")
+        """
+        if self.pretty:
+            # Indented output is for reading, not size; build it in one piece
+            fp.write(self._encode(self._create_content(group_by)))
+            return
+        
+        sheet, root_topic = self._create_sheet()
+        
+        # Both objects are written without their closing brace and completed below
+        fp.write(b'[' + self._encode(sheet)[:-1] + b',"rootTopic":' + self._encode(root_topic)[:-1])
+        fp.write(b',"children":{"attached":[')
+        separator = b""
+        for topic in self._iter_topics(group_by):
+            fp.write(separator + self._encode(topic))
+            separator = b","
+        fp.write(b"]}}}]")
+
+    def _encode(self, obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON: compact by default, indented when pretty."""
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if self.pretty else 0)
+        if self.pretty:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+        return json.dumps(obj, separators=_COMPACT_SEPARATORS, ensure_ascii=False).encode('utf-8')
+
+    def _create_sheet(self) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Create the sheet and its root topic, without the rootTopic link or children."""
         source_file = self.data.get('source_file', 'PDF Highlights')
         if source_file != 'PDF Highlights':
             source_file = Path(source_file).stem
 
-        # Root topic
+        # Root topic, with metadata as notes
         root_topic = {
             "id": self._generate_id(),
             "class": "topic",
             "title": source_file,
             "structureClass": "org.xmind.ui.map.unbalanced",
-            "children": {
-                "attached": []
-            }
-        }
-        
-        # Add metadata as notes
-        root_topic["notes"] = {
-            "plain": {
-                "content": self._create_metadata_text()
+            "notes": {
+                "plain": {
+                    "content": self._create_metadata_text()
+                }
             }
         }
 
-        # Populate children
-        attached = root_topic["children"]["attached"]
-        if group_by == "page":
-            self._add_page_topics(attached)
-        else:
-            self._add_color_topics(attached)
-
         # Sheet
         sheet = {
             "id": self._generate_id(),
             "class": "sheet",
-            "title": f"Highlights: {source_file}",
-            "rootTopic": root_topic
+            "title": f"Highlights: {source_file}"
         }
         
-        return [sheet]
-
-    def _add_page_topics(self, attached_list: list[dict[str, Any]]) -> None:
-        """Add topics organized by page."""
-        highlights = self.data.get('highlights', [])
-        if not highlights:
-            attached_list.append({"id": self._generate_id(), "title": "No highlights found"})
-            return
-
-        # Group by page
-        pages = {}
-        for highlight in highlights:
-            page_num = highlight.get('page', 0)
-            if page_num not in pages:
-                pages[page_num] = []
-            pages[page_num].append(highlight)
+        return sheet, root_topic
 
-        for page_num in sorted(pages.keys()):
-            page_highlights = pages[page_num]
-            
-            page_topic = {
-                "id": self._generate_id(),
-                "title": f"Page {page_num}",
-                "children": {"attached": []}
-            }
-            attached_list.append(page_topic)
-            
-            # Group by color within page
-            colors_in_page = {}
-            for highlight in page_highlights:
-                color_name = highlight.get('color_name', 'unknown')
-                if color_name not in colors_in_page:
-                    colors_in_page[color_name] = []
-                colors_in_page[color_name].append(highlight)
-            
-            for color_name in sorted(colors_in_page.keys()):
-                color_highlights = colors_in_page[color_name]
-                
-                # Group topic style
-                first_color = color_highlights[0].get('color', [])
-                hex_color = rgb_to_hex(first_color)
-                
-                color_topic = {
-                    "id": self._generate_id(),
-                    "title": color_name.title(),
-                    "style": {
-                        "properties": {
-                            "svg:fill": hex_color,
-                            "fill": hex_color,
-                            "shape-class": "org.xmind.topicShape.roundedRect",
-                            "border-line-color": hex_color,
-                            "line-color": hex_color
-                        }
-                    },
-                    "children": {"attached": []}
-                }
-                page_topic["children"]["attached"].append(color_topic)
-                
-                for highlight in color_highlights:
-                    self._add_highlight_topic(color_topic["children"]["attached"], highlight)
+    def _iter_topics(self, group_by: str) -> Iterator[dict[str, Any]]:
+        """Yield the root topic's children for the given grouping."""
+        if group_by == "page":
+            return self._iter_grouped(_page_of, _color_of)
+        return self._iter_grouped(_color_of, _page_of)
 
-    def _add_color_topics(self, attached_list: list[dict[str, Any]]) -> None:
-        """Add topics organized by color."""
-        highlights = self.data.get('highlights', [])
+    def _iter_grouped(
+        self,
+        outer_key: Callable[[dict[str, Any]], Any],
+        inner_key: Callable[[dict[str, Any]], Any]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield top-level topics grouped by ``outer_key``, then by ``inner_key``.
+        
+        Args:
+            outer_key: Grouping for the top-level topics (_page_of or _color_of)
+            inner_key: Grouping for the topics under each of them
+        """
+        highlights = self.data.get('highlights', _EMPTY)
         if not highlights:
-            attached_list.append({"id": self._generate_id(), "title": "No highlights found"})
+            yield {"id": self._generate_id(), "title": "No highlights found"}
             return
 
-        # Group by color
-        colors = {}
-        for highlight in highlights:
-            color_name = highlight.get('color_name', 'unknown')
-            if color_name not in colors:
-                colors[color_name] = []
-            colors[color_name].append(highlight)
-
-        for color_name in sorted(colors.keys()):
-            color_highlights = colors[color_name]
+        for outer, outer_highlights in sorted(_bucket(highlights, outer_key).items()):
+            outer_topic = self._group_topic(outer_key, outer, outer_highlights)
+            outer_attached = outer_topic["children"]["attached"]
             
-            # Group topic style
-            first_color = color_highlights[0].get('color', [])
-            hex_color = rgb_to_hex(first_color)
+            for inner, inner_highlights in sorted(_bucket(outer_highlights, inner_key).items()):
+                inner_topic = self._group_topic(inner_key, inner, inner_highlights)
+                outer_attached.append(inner_topic)
+                
+                for highlight in inner_highlights:
+                    self._add_highlight_topic(inner_topic["children"]["attached"], highlight)
             
-            color_topic = {
+            yield outer_topic
+
+    def _group_topic(
+        self,
+        key: Callable[[dict[str, Any]], Any],
+        value: Any,
+        highlights: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Create an empty page or color group topic for ``value``."""
+        if key is _color_of:
+            return {
                 "id": self._generate_id(),
-                "title": color_name.title(),
-                "style": {
-                    "properties": {
-                        "svg:fill": hex_color,
-                        "fill": hex_color,
-                        "shape-class": "org.xmind.topicShape.roundedRect",
-                        "border-line-color": hex_color,
-                        "line-color": hex_color
-                    }
-                },
+                "title": self._color_title(value),
+                "style": _group_style(highlight_hex(highlights[0])),
                 "children": {"attached": []}
             }
-            attached_list.append(color_topic)
-            
-            # Group by page within color
-            pages = {}
-            for highlight in color_highlights:
-                page_num = highlight.get('page', 0)
-                if page_num not in pages:
-                    pages[page_num] = []
-                pages[page_num].append(highlight)
-            
-            for page_num in sorted(pages.keys()):
-                page_highlights = pages[page_num]
-                
-                page_topic = {
-                    "id": self._generate_id(),
-                    "title": f"Page {page_num}",
-                    "children": {"attached": []}
-                }
-                color_topic["children"]["attached"].append(page_topic)
-                
-                for highlight in page_highlights:
-                    self._add_highlight_topic(page_topic["children"]["attached"], highlight)
+        return {
+            "id": self._generate_id(),
+            "title": f"Page {value}",
+            "children": {"attached": []}
+        }
 
     def _add_highlight_topic(self, attached_list: list[dict[str, Any]], highlight: dict[str, Any]) -> None:
         """Add a highlight topic."""
         text = highlight.get('text', 'No text')
-        color_rgb = highlight.get('color', [])
-        hex_color = rgb_to_hex(color_rgb)
+        hex_color = highlight_hex(highlight)
         
         topic = {
             "id": self._generate_id(),
             "title": text,
-            "style": {
-                "properties": {
-                    "svg:fill": hex_color,
-                    "shape-class": "org.xmind.topicShape.roundedRect",
-                    "border-line-color": hex_color
-                }
-            }
+            "style": _highlight_style(hex_color)
         }
         attached_list.append(topic)
 
@@ -251,14 +320,17 @@ class XMindExporter:
             f"Source Path: {self.data.get('source_path', 'N/A')}"
         )
 
-    def _create_metadata(self) -> dict[str, Any]:
-        """Create metadata dict."""
+    def _created(self) -> str:
+        """Get the creation date: the extraction date, or now if there is none."""
+        if 'extraction_date' in self.data:
+            return self.data['extraction_date']
+        return datetime.now().isoformat()
+
+    def _create_metadata(self, created: str | None = None) -> dict[str, Any]:
+        """Create metadata dict, using ``created`` when the caller already has it."""
         return {
-            "creator": {
-                "name": "PDF Highlight Extractor",
-                "version": "1.0.0"
-            },
-            "created": self.data.get('extraction_date', datetime.now().isoformat())
+            "creator": dict(_CREATOR),
+            "created": self._created() if created is None else created
         }
 
     def _create_manifest(self) -> dict[str, Any]:
@@ -273,16 +345,18 @@ class XMindExporter:
 
 def export_to_xmind(
     highlights_data: dict[str, Any],
-    output_path: str,
-    group_by: str = "page"
+    output_path: str | os.PathLike | BinaryIO,
+    group_by: str = "page",
+    compresslevel: int = DEFAULT_COMPRESSLEVEL
 ) -> None:
     """
     Convenience function to export highlights to XMind.
     
     Args:
         highlights_data: Dictionary containing extraction results
-        output_path: Path to save the XMind file
+        output_path: Path to save the XMind file, or a writable binary stream
         group_by: How to organize highlights ("page" or "color")
+        compresslevel: Deflate level, 1 (fastest) to 9 (smallest)
     """
     exporter = XMindExporter(highlights_data)
-    exporter.export(output_path, group_by)
+    exporter.export(output_path, group_by, compresslevel)
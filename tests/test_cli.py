@@ -59,7 +59,7 @@ class TestParseArguments:
 class TestMain:
     """Tests for main CLI function."""
     
-    @patch('src.cli.extract_highlights_from_pdf')
+    @patch('src.extractor.extract_highlights_from_pdf')
     @patch('src.cli.validate_output_path')
     @patch('src.cli.validate_pdf_file')
     def test_successful_extraction(
@@ -116,7 +116,7 @@ class TestMain:
         
         assert exit_code == 1
     
-    @patch('src.cli.extract_highlights_from_pdf')
+    @patch('src.extractor.extract_highlights_from_pdf')
     @patch('src.cli.validate_output_path')
     @patch('src.cli.validate_pdf_file')
     def test_no_highlights_found(
@@ -144,7 +144,7 @@ class TestMain:
         assert exit_code == 0
         assert output_file.exists()
     
-    @patch('src.cli.extract_highlights_from_pdf')
+    @patch('src.extractor.extract_highlights_from_pdf')
     @patch('src.cli.validate_output_path')
     @patch('src.cli.validate_pdf_file')
     def test_extraction_error(
@@ -163,7 +163,7 @@ class TestMain:
         
         assert exit_code == 1
     
-    @patch('src.cli.extract_highlights_from_pdf')
+    @patch('src.extractor.extract_highlights_from_pdf')
     @patch('src.cli.validate_output_path')
     @patch('src.cli.validate_pdf_file')
     def test_pretty_output(
@@ -1,12 +1,26 @@
 """Tests for PDF extraction functionality."""
 
+import pickle
 import tempfile
+from multiprocessing import ProcessError
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
+import fitz
 import pytest
 
-from src.extractor import HighlightExtractor, extract_highlights_from_pdf
+from src.extractor import (
+    PAGE_WORDS_CACHE_SIZE,
+    PARALLEL_PAGE_THRESHOLD,
+    Highlight,
+    HighlightExtractor,
+    _extract_range,
+    _normalize_color,
+    _parse_pdf_date,
+    _quad_rects,
+    _words_in_rect,
+    extract_highlights_from_pdf,
+)
 
 
 class TestHighlightExtractor:
@@ -15,11 +29,13 @@ class TestHighlightExtractor:
     @patch('src.extractor.fitz.open')
     def test_context_manager(self, mock_fitz_open):
         """Test that extractor works as a context manager."""
-        mock_doc = Mock()
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = 3
         mock_fitz_open.return_value = mock_doc
         
         with HighlightExtractor("test.pdf") as extractor:
             assert extractor.doc == mock_doc
+            assert extractor._total_pages == 3
         
         mock_doc.close.assert_called_once()
     
@@ -58,7 +74,11 @@ class TestHighlightExtractor:
         # Create mock page
         mock_page = Mock()
         mock_page.annots.return_value = [mock_annot]
-        mock_page.get_text.return_value = "Highlighted text"
+        mock_page.get_text.return_value = [
+            (100, 200, 180, 220, "Highlighted", 0, 0, 0),
+            (185, 200, 230, 220, "text", 0, 0, 1),
+            (100, 400, 180, 420, "Elsewhere", 1, 0, 0),
+        ]
         
         mock_doc.__getitem__.return_value = mock_page
         mock_fitz_open.return_value = mock_doc
@@ -69,11 +89,14 @@ class TestHighlightExtractor:
         assert result['total_highlights'] == 1
         assert len(result['highlights']) == 1
     
+        mock_page.get_text.assert_called_once_with("words")
+        
         highlight = result['highlights'][0]
         assert highlight['page'] == 1
         assert highlight['text'] == "Highlighted text"
         assert highlight['color'] == [1.0, 1.0, 0.0]
         assert highlight['color_name'] == "Yellow"
+        assert highlight['color_hex'] == "#FFFF00"
     
     @patch('src.extractor.fitz.open')
     def test_extract_highlights_skips_non_highlights(self, mock_fitz_open):
@@ -85,8 +108,11 @@ class TestHighlightExtractor:
         mock_annot = Mock()
         mock_annot.type = (1, "Text")  # Not a highlight
         
+        # Emulate PyMuPDF's type filtering
         mock_page = Mock()
-        mock_page.annots.return_value = [mock_annot]
+        mock_page.annots.side_effect = lambda types=None: [
+            a for a in [mock_annot] if types is None or a.type[0] in types
+        ]
         
         mock_doc.__getitem__.return_value = mock_page
         mock_fitz_open.return_value = mock_doc
@@ -96,6 +122,7 @@ class TestHighlightExtractor:
         
         assert result['total_highlights'] == 0
         assert result['highlights'] == []
+        mock_page.annots.assert_called_once_with(types=[fitz.PDF_ANNOT_HIGHLIGHT])
     
     @patch('src.extractor.fitz.open')
     def test_extract_highlights_handles_errors(self, mock_fitz_open):
@@ -106,7 +133,7 @@ class TestHighlightExtractor:
         # Create two annotations: one that fails, one that succeeds
         mock_bad_annot = Mock()
         mock_bad_annot.type = (8, "Highlight")
-        mock_bad_annot.colors = {"stroke": [1.0, 1.0, 0.0]}
+        mock_bad_annot.colors = None  # Broken color data
         mock_bad_annot.rect = Mock(x0=100, y0=200, x1=300, y1=220)
         mock_bad_annot.vertices = []
         mock_bad_annot.info = {}
@@ -120,9 +147,11 @@ class TestHighlightExtractor:
         
         mock_page = Mock()
         mock_page.annots.return_value = [mock_bad_annot, mock_good_annot]
-        
-        # First call raises exception, second succeeds
-        mock_page.get_text.side_effect = [Exception("Error"), "Good text"]
+        mock_page.get_text.return_value = [
+            (100, 200, 180, 220, "Bad", 0, 0, 0),
+            (100, 250, 180, 270, "Good", 1, 0, 0),
+            (185, 250, 230, 270, "text", 1, 0, 1),
+        ]
         
         mock_doc.__getitem__.return_value = mock_page
         mock_fitz_open.return_value = mock_doc
@@ -134,6 +163,303 @@ class TestHighlightExtractor:
         assert result['total_highlights'] == 1
         assert result['highlights'][0]['text'] == "Good text"
 
+    @patch('src.extractor._MP_CONTEXT')
+    @patch('src.extractor.fitz.open')
+    def test_small_pdf_stays_sequential(self, mock_fitz_open, mock_context):
+        """Test that PDFs below the threshold don't start worker processes."""
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = PARALLEL_PAGE_THRESHOLD - 1
+        mock_page = Mock()
+        mock_page.annots.return_value = None
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            result = extractor.extract_highlights()
+        
+        mock_context.Pool.assert_not_called()
+        assert result['total_pages'] == PARALLEL_PAGE_THRESHOLD - 1
+    
+    @patch('src.extractor.cpu_count', return_value=2)
+    @patch('src.extractor._MP_CONTEXT')
+    @patch('src.extractor.fitz.open')
+    def test_large_pdf_split_across_workers(self, mock_fitz_open, mock_context, mock_cpu_count):
+        """Test that large PDFs are split into page ranges and results flattened."""
+        total = PARALLEL_PAGE_THRESHOLD
+        half = total // 2
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = total
+        mock_fitz_open.return_value = mock_doc
+        
+        pool = mock_context.Pool.return_value.__enter__.return_value
+        pool.starmap.return_value = [
+            [Highlight(1, "a", [1.0, 1.0, 0.0], "Yellow", [0, 0, 1, 1])],
+            [Highlight(6, "b", [1.0, 1.0, 0.0], "Yellow", [0, 0, 1, 1]),
+             Highlight(7, "c", [1.0, 0.0, 0.0], "Red", [0, 0, 1, 1])],
+        ]
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            result = extractor.extract_highlights()
+        
+        mock_context.Pool.assert_called_once_with(2)
+        pool.starmap.assert_called_once_with(
+            _extract_range, [("test.pdf", 0, half), ("test.pdf", half, total)]
+        )
+        assert result['total_highlights'] == 3
+        assert [h['page'] for h in result['highlights']] == [1, 6, 7]
+    
+    @pytest.mark.parametrize("error", [
+        OSError("no semaphores"),
+        ProcessError("worker died"),
+        pickle.PicklingError("can't pickle"),
+    ])
+    @patch('src.extractor.cpu_count', return_value=2)
+    @patch('src.extractor._MP_CONTEXT')
+    @patch('src.extractor.fitz.open')
+    def test_parallel_falls_back_to_sequential(self, mock_fitz_open, mock_context, mock_cpu_count, error):
+        """Test that extraction still succeeds when a pool can't be started or used."""
+        mock_context.Pool.side_effect = error
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = PARALLEL_PAGE_THRESHOLD
+        mock_page = Mock()
+        mock_page.annots.return_value = None
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            result = extractor.extract_highlights()
+        
+        assert result['total_highlights'] == 0
+        assert mock_doc.__getitem__.call_count == PARALLEL_PAGE_THRESHOLD
+
+    @patch('src.extractor.fitz.open')
+    def test_multiline_highlight_uses_quads(self, mock_fitz_open):
+        """Test that each quad only picks up the words it covers."""
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = 1
+        
+        mock_annot = Mock()
+        mock_annot.type = (8, "Highlight")
+        mock_annot.colors = {"stroke": [1.0, 1.0, 0.0]}
+        mock_annot.rect = Mock(x0=100, y0=200, x1=300, y1=240)
+        mock_annot.vertices = [
+            (150, 200), (300, 200), (150, 220), (300, 220),  # End of line 1
+            (100, 220), (160, 220), (100, 240), (160, 240),  # Start of line 2
+        ]
+        mock_annot.info = {}
+        
+        mock_page = Mock()
+        mock_page.annots.return_value = [mock_annot]
+        mock_page.get_text.return_value = [
+            (100, 200, 140, 220, "Not", 0, 0, 0),
+            (150, 200, 200, 220, "first", 0, 0, 1),
+            (205, 200, 290, 220, "line", 0, 0, 2),
+            (100, 220, 150, 240, "second", 0, 1, 0),
+            (155, 220, 250, 240, "excluded", 0, 1, 1),  # Mostly outside the quad
+        ]
+        
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            result = extractor.extract_highlights()
+        
+        assert result['highlights'][0]['text'] == "first line second"
+
+    @patch('src.extractor.fitz.open')
+    def test_pages_without_highlights_are_skipped(self, mock_fitz_open):
+        """Test that pages whose /Annots hold no highlights aren't decoded."""
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = 1
+        
+        mock_page = Mock()
+        mock_page.annot_xrefs.return_value = [(12, 0, "note-1")]  # Text annotation only
+        
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            result = extractor.extract_highlights()
+        
+        assert result['total_highlights'] == 0
+        mock_page.annots.assert_not_called()
+        mock_page.get_text.assert_not_called()
+
+    @patch('src.extractor.fitz.open')
+    def test_page_words_reused_across_extractions(self, mock_fitz_open):
+        """Test that a second extraction doesn't re-parse the page text."""
+        mock_doc = MagicMock()
+        mock_doc.__len__.return_value = 1
+        
+        mock_annot = Mock()
+        mock_annot.type = (8, "Highlight")
+        mock_annot.colors = {"stroke": [1.0, 1.0, 0.0]}
+        mock_annot.rect = Mock(x0=100, y0=200, x1=300, y1=220)
+        mock_annot.vertices = []
+        mock_annot.info = {}
+        
+        mock_page = Mock()
+        mock_page.annots.return_value = [mock_annot]
+        mock_page.get_text.return_value = [(100, 200, 180, 220, "Cached", 0, 0, 0)]
+        
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        with HighlightExtractor("test.pdf") as extractor:
+            first = extractor.extract_highlights()
+            second = extractor.extract_highlights()
+        
+        assert first['highlights'] == second['highlights']
+        mock_page.get_text.assert_called_once_with("words")
+    
+    def test_page_words_cache_is_bounded(self):
+        """Test that the least recently used page is evicted first."""
+        extractor = HighlightExtractor("test.pdf")
+        page = Mock()
+        page.get_text.return_value = []
+        
+        for page_num in range(1, PAGE_WORDS_CACHE_SIZE + 1):
+            extractor._get_page_words(page, page_num)
+        extractor._get_page_words(page, 1)  # Refresh page 1
+        extractor._get_page_words(page, PAGE_WORDS_CACHE_SIZE + 1)
+        
+        assert len(extractor._page_words) == PAGE_WORDS_CACHE_SIZE
+        assert 1 in extractor._page_words
+        assert 2 not in extractor._page_words
+
+
+class TestExtractRange:
+    """Tests for the worker entry point."""
+    
+    @patch('src.extractor.fitz.open')
+    def test_extract_range_reopens_document(self, mock_fitz_open):
+        """Test that the worker opens the PDF itself and only visits its pages."""
+        mock_doc = MagicMock()
+        mock_page = Mock()
+        mock_page.annots.return_value = None
+        mock_doc.__getitem__.return_value = mock_page
+        mock_fitz_open.return_value = mock_doc
+        
+        assert _extract_range("test.pdf", 3, 6) == []
+        
+        mock_fitz_open.assert_called_once_with("test.pdf")
+        assert [c.args[0] for c in mock_doc.__getitem__.call_args_list] == [3, 4, 5]
+        mock_doc.close.assert_called_once()
+
+
+class TestHighlight:
+    """Tests for the Highlight record."""
+    
+    def test_to_dict_layout(self):
+        highlight = Highlight(2, "text", [1.0, 0.0, 0.0], "Red", [1, 2, 3, 4], "Me", None, "#FF0000")
+        assert highlight.to_dict() == {
+            "page": 2,
+            "text": "text",
+            "color": [1.0, 0.0, 0.0],
+            "color_name": "Red",
+            "color_hex": "#FF0000",
+            "rect": [1, 2, 3, 4],
+            "author": "Me",
+            "created": None
+        }
+    
+    def test_survives_pickling(self):
+        highlight = Highlight(1, "text", [1.0, 1.0, 0.0], "Yellow", [0, 0, 1, 1])
+        assert pickle.loads(pickle.dumps(highlight)) == highlight
+
+
+class TestNormalizeColor:
+    """Tests for annotation color normalization."""
+    
+    @pytest.mark.parametrize("colors,expected", [
+        ({"stroke": (1.0, 0.0, 0.0), "fill": (0.0, 1.0, 0.0)}, (1.0, 0.0, 0.0)),
+        ({"stroke": None, "fill": (0.0, 1.0, 0.0)}, (0.0, 1.0, 0.0)),
+        ({"stroke": [0.2, 0.4, 0.6, 1.0]}, (0.2, 0.4, 0.6)),
+        ({"stroke": [0.5]}, (0.5, 0.5, 0.5)),
+        ({"stroke": (0.2, 0.4)}, (0.2, 0.4, 0.0)),
+        ({"stroke": ()}, (0.0, 0.0, 0.0)),
+        ({"stroke": {}}, (1.0, 1.0, 0.0)),
+        ({}, (1.0, 1.0, 0.0)),
+    ])
+    def test_normalize(self, colors, expected):
+        assert _normalize_color(colors) == expected
+
+
+class TestParsePdfDate:
+    """Tests for PDF date conversion."""
+    
+    @pytest.mark.parametrize("value,expected", [
+        ("D:20260115103000", "2026-01-15T10:30:00"),
+        ("D:20260115103000Z", "2026-01-15T10:30:00+00:00"),
+        ("D:20260115103000+01'00'", "2026-01-15T10:30:00+01:00"),
+        ("D:20260115103000-05'30", "2026-01-15T10:30:00-05:30"),
+        ("D:2026", "2026-01-01T00:00:00"),
+        ("20260115", "2026-01-15T00:00:00"),
+    ])
+    def test_parse(self, value, expected):
+        assert _parse_pdf_date(value) == expected
+    
+    @pytest.mark.parametrize("value", ["yesterday", "D:20261345000000", ""])
+    def test_invalid_returns_none(self, value):
+        assert _parse_pdf_date(value) is None
+    
+    def test_unparseable_date_kept_raw(self):
+        mock_annot = Mock()
+        mock_annot.colors = {"stroke": (1.0, 1.0, 0.0)}
+        mock_annot.rect = Mock(x0=0, y0=0, x1=10, y1=10)
+        mock_annot.vertices = None
+        mock_annot.info = {"creationDate": "sometime"}
+        words = [(1, 1, 9, 9, "text", 0, 0, 0)]
+        
+        highlight = HighlightExtractor("test.pdf")._extract_highlight_data(
+            Mock(), mock_annot, 1, words
+        )
+        
+        assert highlight.created == "sometime"
+
+
+class TestQuadRects:
+    """Tests for quadpoint reduction."""
+    
+    def test_one_rect_per_quad(self):
+        vertices = [
+            (10, 5), (40, 5), (10, 15), (40, 15),
+            (0, 15), (20, 14), (0, 25), (20, 25),
+        ]
+        assert _quad_rects(vertices) == [(10, 5, 40, 15), (0, 14, 20, 25)]
+    
+    def test_ignores_partial_quad(self):
+        vertices = [(0, 0), (1, 0), (0, 1), (1, 1), (5, 5), (6, 5)]
+        assert _quad_rects(vertices) == [(0, 0, 1, 1)]
+
+
+class TestWordsInRect:
+    """Tests for selecting highlighted words."""
+    
+    # One line of page.get_text("words") output: (x0, y0, x1, y1, word, block, line, word_no)
+    WORDS = [
+        (10.0, 100.0, 40.0, 112.0, "Sphinx", 0, 0, 0),
+        (44.0, 100.0, 56.0, 112.0, "of", 0, 0, 1),
+        (60.0, 100.0, 90.0, 112.0, "black", 0, 0, 2),
+        (94.0, 100.0, 136.0, 112.0, "quartz,", 0, 0, 3),
+        (140.0, 100.0, 170.0, 112.0, "judge", 0, 0, 4),
+    ]
+    
+    def test_trailing_punctuation_kept(self):
+        # The highlight stops before the comma; the whole word is still taken
+        assert _words_in_rect(self.WORDS, (60.0, 100.0, 130.0, 112.0)) == "black quartz,"
+    
+    def test_mostly_covered_word_included_whole(self):
+        # Two thirds of "Sphinx" is covered
+        assert _words_in_rect(self.WORDS, (20.0, 100.0, 56.0, 112.0)) == "Sphinx of"
+    
+    def test_barely_covered_words_excluded(self):
+        # Only the edges of "of" and "judge" are touched
+        assert _words_in_rect(self.WORDS, (52.0, 100.0, 145.0, 112.0)) == "black quartz,"
+    
+    def test_other_lines_ignored(self):
+        assert _words_in_rect(self.WORDS, (10.0, 120.0, 170.0, 132.0)) == ""
+
 
 class TestExtractHighlightsFromPdf:
     """Tests for convenience function."""
@@ -153,3 +153,24 @@ def test_color_grouping_within_page(sample_data):
     assert "#### Yellow" in page1_section or "#### Red" in page1_section
     assert "> <span style=\"color: #FFFF00\">First highlight on page 1</span>" in page1_section
     assert "> <span style=\"color: #FF0000\">Second highlight on page 1</span>" in page1_section
+
+
+@pytest.mark.parametrize("group_by", ["page", "color"])
+def test_export_ends_with_single_newline(sample_data, tmp_path, group_by):
+    """Test that the file ends after the last blockquote with one newline."""
+    output_file = tmp_path / "test_output.md"
+    
+    NotionExporter(sample_data).export(output_file, group_by=group_by)
+    
+    content = output_file.read_bytes()
+    assert content.endswith(b"</span>\n")
+    assert content == NotionExporter(sample_data)._generate_markdown(group_by).encode('utf-8')
+
+
+def test_export_no_highlights_ends_with_single_newline(tmp_path):
+    """Test the trailing bytes of a document without highlights."""
+    output_file = tmp_path / "empty.md"
+    
+    NotionExporter({"highlights": []}).export(output_file, group_by='page')
+    
+    assert output_file.read_bytes().endswith(b"## Highlights\n\n*No highlights found in this document.*\n")
@@ -0,0 +1,183 @@
+"""Tests for TUI helper functions."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.tui import FilteredDirectoryTree, _is_listed, _scan_dir_flags, generate_tui_preview, iter_tui_preview
+
+
+class TestScanDirFlags:
+    """Tests for mapping directory entries to is-directory flags."""
+    
+    def test_files_and_directories(self, tmp_path):
+        (tmp_path / "doc.pdf").write_text("pdf")
+        (tmp_path / "sub").mkdir()
+        
+        assert _scan_dir_flags(tmp_path) == {"doc.pdf": False, "sub": True}
+    
+    def test_symlinks_are_followed(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        os.symlink(tmp_path / "sub", tmp_path / "link_to_dir")
+        os.symlink(tmp_path / "missing", tmp_path / "broken_link")
+        
+        flags = _scan_dir_flags(tmp_path)
+        assert flags["link_to_dir"] is True
+        assert flags["broken_link"] is False
+    
+    def test_unreadable_directory(self, tmp_path):
+        assert _scan_dir_flags(tmp_path / "missing") == {}
+    
+    @patch('src.tui.os.scandir', side_effect=PermissionError("denied"))
+    def test_permission_denied(self, mock_scandir, tmp_path):
+        assert _scan_dir_flags(tmp_path) == {}
+
+
+class TestIsListed:
+    """Tests for which entries the file browser shows."""
+    
+    @pytest.mark.parametrize("name", [".hidden.pdf", ".git", ".env"])
+    def test_hidden_entries_excluded(self, name):
+        assert not _is_listed(Path("/docs") / name, {name: True})
+    
+    @pytest.mark.parametrize("name", ["doc.pdf", "DOC.PDF", "link.Pdf"])
+    def test_pdfs_listed_without_lookup(self, name):
+        with patch.object(Path, "is_dir") as mock_is_dir:
+            assert _is_listed(Path("/docs") / name, {})
+        mock_is_dir.assert_not_called()
+    
+    def test_directories_listed(self):
+        assert _is_listed(Path("/docs/sub"), {"sub": True})
+    
+    def test_other_files_excluded(self):
+        assert not _is_listed(Path("/docs/notes.txt"), {"notes.txt": False})
+    
+    def test_unscanned_directory_falls_back_to_stat(self, tmp_path):
+        # An unreadable parent yields no flags; the entry is still checked directly
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "notes.txt").write_text("notes")
+        
+        assert _is_listed(tmp_path / "sub", {})
+        assert not _is_listed(tmp_path / "notes.txt", {})
+    
+    def test_symlinked_directory_listed(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        os.symlink(tmp_path / "sub", tmp_path / "link_to_dir")
+        
+        flags = _scan_dir_flags(tmp_path)
+        assert _is_listed(tmp_path / "link_to_dir", flags)
+
+
+PREVIEW_DATA = {
+    "source_path": "/docs/paper.pdf",
+    "total_pages": 3,
+    "total_highlights": 4,
+    "extraction_date": "2026-01-31T21:00:00Z",
+    "highlights": [
+        {"page": 2, "text": "Second page", "color": [1.0, 0.0, 0.0], "color_name": "Red"},
+        {"page": 1, "text": "First yellow", "color": [1.0, 1.0, 0.0], "color_name": "Yellow"},
+        {"page": 1, "text": "First red", "color": [1.0, 0.0, 0.0], "color_name": "Red"},
+        {"page": 1, "text": "Second yellow", "color": [1.0, 1.0, 0.0], "color_name": "Yellow"},
+    ],
+}
+
+# Lines rendered by the original list-building preview, before it became a generator
+PREVIEW_HEADER = [
+    "[bold underline]paper[/]", "",
+    "[bold]Document Information[/]",
+    "- [bold]Source:[/]: /docs/paper.pdf",
+    "- [bold]Total Pages:[/] 3",
+    "- [bold]Total Highlights:[/] 4",
+    "- [bold]Extraction Date:[/] 2026-01-31T21:00:00Z", "",
+    "[bold]Highlights[/]", "",
+]
+PREVIEW_BY_PAGE = [
+    "[bold]Page 1[/]",
+    "  [bold]Red[/]",
+    "    [#FF0000]First red[/#FF0000]", "",
+    "  [bold]Yellow[/]",
+    "    [#FFFF00]First yellow[/#FFFF00]", "",
+    "    [#FFFF00]Second yellow[/#FFFF00]", "",
+    "[bold]Page 2[/]",
+    "  [bold]Red[/]",
+    "    [#FF0000]Second page[/#FF0000]", "",
+]
+PREVIEW_BY_COLOR = [
+    "[bold]Red[/]",
+    "  [bold]Page 1[/]",
+    "    [#FF0000]First red[/#FF0000]", "",
+    "  [bold]Page 2[/]",
+    "    [#FF0000]Second page[/#FF0000]", "",
+    "[bold]Yellow[/]",
+    "  [bold]Page 1[/]",
+    "    [#FFFF00]First yellow[/#FFFF00]", "",
+    "    [#FFFF00]Second yellow[/#FFFF00]", "",
+]
+
+
+class TestFilteredDirectoryTree:
+    """Tests for the file browser's path filtering."""
+    
+    @pytest.fixture
+    def tree_root(self, tmp_path):
+        (tmp_path / "doc.pdf").write_text("pdf")
+        (tmp_path / "notes.txt").write_text("notes")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "inner.pdf").write_text("pdf")
+        (tmp_path / "sub" / "inner.txt").write_text("notes")
+        return tmp_path
+    
+    @pytest.fixture
+    def tree(self, tree_root):
+        # Setting the path schedules a reload, which needs a running app
+        with patch.object(FilteredDirectoryTree, "watch_path", lambda self: None):
+            return FilteredDirectoryTree(tree_root)
+    
+    def test_root_listing_gets_parent_entry(self, tree, tree_root):
+        filtered = list(tree.filter_paths(sorted(tree_root.iterdir())))
+        assert filtered == [tree_root / "..", tree_root / "doc.pdf", tree_root / "sub"]
+    
+    def test_subdirectory_listing_has_no_parent_entry(self, tree, tree_root):
+        sub = tree_root / "sub"
+        filtered = list(tree.filter_paths(sorted(sub.iterdir())))
+        assert filtered == [sub / "inner.pdf"]
+    
+    def test_empty_listing(self, tree):
+        assert list(tree.filter_paths([])) == []
+
+
+class TestTuiPreview:
+    """Tests for the Rich-markup highlight preview."""
+    
+    @pytest.mark.parametrize("group_by,expected_body", [
+        ("page", PREVIEW_BY_PAGE),
+        ("color", PREVIEW_BY_COLOR),
+        ("none", PREVIEW_BY_COLOR),  # Anything but "page" groups by color
+    ])
+    def test_matches_original_rendering(self, group_by, expected_body):
+        lines = generate_tui_preview(PREVIEW_DATA, group_by).split("\n")
+        assert lines == PREVIEW_HEADER + expected_body
+    
+    @pytest.mark.parametrize("group_by", ["page", "color", "none"])
+    def test_generator_matches_joined_preview(self, group_by):
+        joined = "\n".join(iter_tui_preview(PREVIEW_DATA, group_by))
+        assert joined == generate_tui_preview(PREVIEW_DATA, group_by)
+    
+    def test_no_highlights(self):
+        lines = generate_tui_preview({"highlights": []}, "page").split("\n")
+        assert lines == [
+            "[bold underline]Unknown PDF[/]", "",
+            "[bold]Document Information[/]",
+            "- [bold]Source:[/]: Unknown PDF",
+            "- [bold]Total Pages:[/] N/A",
+            "- [bold]Total Highlights:[/] 0",
+            "- [bold]Extraction Date:[/] N/A", "",
+            "[italic]No highlights found in this document.[/]", "",
+        ]
+    
+    def test_stored_hex_is_used(self):
+        data = {"highlights": [{"page": 1, "text": "t", "color": [1.0, 0.0, 0.0],
+                                "color_name": "Red", "color_hex": "#123456"}]}
+        assert "    [#123456]t[/#123456]\n" in generate_tui_preview(data, "page")
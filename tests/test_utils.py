@@ -1,48 +1,131 @@
 """Tests for utility functions."""
 
+import errno
 import json
+import os
+import stat
 import tempfile
 from pathlib import Path
 
 import pytest
 
+try:
+    import orjson as _json  # Parses without the stdlib wrapper's keyword handling
+except ImportError:
+    import json as _json
+
+from src import utils
 from src.utils import (
     rgb_to_color_name,
+    rgb_to_color_names,
+    rgb_to_hex,
+    format_json_bytes,
     format_json_output,
+    format_json_to_file,
+    highlight_hex,
     validate_pdf_file,
     validate_output_path
 )
 
 
+# Exact palette colors, and off-palette colors with the hue their name should contain
+_COLOR_CASES = (
+    ((1.0, 1.0, 0.0), "Yellow"),
+    ((1.0, 0.0, 0.0), "Red"),
+    ((0.0, 1.0, 0.0), "Green"),
+    ((0.0, 0.0, 1.0), "Blue"),
+    ((1.0, 0.5, 0.0), "Orange"),
+)
+_NEAR_COLOR_CASES = (
+    ((0.8, 0.2, 0.1), "Red"),
+    ((0.2, 0.8, 0.1), "Green"),
+    ((0.1, 0.2, 0.8), "Blue"),
+)
+
+
+def _stat_result(mode: int) -> os.stat_result:
+    """Build a stat result carrying only the given st_mode."""
+    return os.stat_result((mode,) + (0,) * 9)
+
+
 class TestRgbToColorName:
     """Tests for RGB to color name conversion."""
     
-    def test_yellow(self):
-        assert rgb_to_color_name((1.0, 1.0, 0.0)) == "Yellow"
+    @pytest.mark.parametrize("rgb,name", _COLOR_CASES)
+    def test_exact_color(self, rgb, name):
+        assert rgb_to_color_name(rgb) == name
+    
+    @pytest.mark.parametrize("rgb,name", _NEAR_COLOR_CASES)
+    def test_unknown_color_nearest(self, rgb, name):
+        assert name in rgb_to_color_name(rgb)
+    
+    def test_accepts_list(self):
+        assert rgb_to_color_name([1.0, 1.0, 0.0]) == "Yellow"
+        assert rgb_to_color_name([1.0, 1.0, 0.0]) == "Yellow"  # Cached path
+    
+    def test_too_few_components(self):
+        assert rgb_to_color_name((1.0, 1.0)) == "unknown"
+    
+    def test_grayscale_matches_gray_names(self):
+        assert rgb_to_color_name((0.52, 0.5, 0.48)) == "Gray"
+        assert rgb_to_color_name((1.0, 1.0, 1.0)) == "White"
+    
+    def test_chromatic_skips_gray_names(self):
+        # Nearest overall is Light Gray, but the input clearly has color
+        assert rgb_to_color_name((0.95, 0.78, 0.78)) not in utils._GRAYSCALE_NAMES
+
+
+class TestRgbToColorNames:
+    """Tests for batch RGB to color name conversion."""
+    
+    def test_matches_single_conversion(self):
+        rgbs = [(1.0, 1.0, 0.0), [0.8, 0.2, 0.1], (0.0, 0.0, 1.0), [1.0, 1.0, 0.0]]
+        assert rgb_to_color_names(rgbs) == [rgb_to_color_name(rgb) for rgb in rgbs]
+    
+    def test_batch_of_single_color_cases(self):
+        cases = _COLOR_CASES + _NEAR_COLOR_CASES
+        assert rgb_to_color_names([rgb for rgb, _ in cases]) == [name for _, name in cases]
     
-    def test_red(self):
-        assert rgb_to_color_name((1.0, 0.0, 0.0)) == "Red"
+    def test_invalid_entries(self):
+        assert rgb_to_color_names([(), None, (1.0, 1.0)]) == ["unknown"] * 3
     
-    def test_green(self):
-        assert rgb_to_color_name((0.0, 1.0, 0.0)) == "Green"
+    def test_empty(self):
+        assert rgb_to_color_names([]) == []
+
+
+class TestRgbToHex:
+    """Tests for RGB to HEX conversion."""
+    
+    def test_unit_range(self):
+        assert rgb_to_hex((1.0, 0.5, 0.0)) == "#FF7F00"
+    
+    def test_accepts_list(self):
+        assert rgb_to_hex([0.0, 1.0, 0.0]) == "#00FF00"
+        assert rgb_to_hex([0.0, 1.0, 0.0]) == "#00FF00"  # Cached path
     
-    def test_blue(self):
-        assert rgb_to_color_name((0.0, 0.0, 1.0)) == "Blue"
+    def test_255_range(self):
+        assert rgb_to_hex((255, 0, 0)) == "#FF0000"
     
-    def test_orange(self):
-        assert rgb_to_color_name((1.0, 0.5, 0.0)) == "Orange"
+    def test_too_few_components(self):
+        assert rgb_to_hex([]) == "#FFFFFF"
     
-    def test_unknown_color_reddish(self):
-        result = rgb_to_color_name((0.8, 0.2, 0.1))
-        assert "Red" in result
+    def test_repeated_color_is_cached(self):
+        utils._rgb_components_to_hex.cache_clear()
+        for _ in range(3):
+            assert rgb_to_hex([0.0, 0.5, 1.0]) == "#007FFF"
+        info = utils._rgb_components_to_hex.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+
+
+class TestHighlightHex:
+    """Tests for reading a highlight's HEX color."""
     
-    def test_unknown_color_greenish(self):
-        result = rgb_to_color_name((0.2, 0.8, 0.1))
-        assert "Green" in result
+    def test_prefers_stored_hex(self):
+        assert highlight_hex({"color": [1.0, 0.0, 0.0], "color_hex": "#123456"}) == "#123456"
     
-    def test_unknown_color_blueish(self):
-        result = rgb_to_color_name((0.1, 0.2, 0.8))
-        assert "Blue" in result
+    def test_falls_back_to_color(self):
+        assert highlight_hex({"color": [1.0, 0.0, 0.0]}) == "#FF0000"
+        assert highlight_hex({}) == "#FFFFFF"
 
 
 class TestFormatJsonOutput:
@@ -52,7 +135,7 @@ class TestFormatJsonOutput:
         data = {"key": "value", "number": 42}
         result = format_json_output(data, pretty=False)
         assert "\n" not in result or result.count("\n") <= 1
-        parsed = json.loads(result)
+        parsed = _json.loads(result)
         assert parsed == data
     
     def test_pretty_format(self):
@@ -60,7 +143,7 @@ class TestFormatJsonOutput:
         result = format_json_output(data, pretty=True)
         assert "\n" in result
         assert "  " in result  # Check for indentation
-        parsed = json.loads(result)
+        parsed = _json.loads(result)
         assert parsed == data
     
     def test_unicode_characters(self):
@@ -68,29 +151,99 @@ class TestFormatJsonOutput:
         result = format_json_output(data, pretty=False)
         assert "世界" in result
         assert "🌍" in result
-        parsed = json.loads(result)
+        parsed = _json.loads(result)
         assert parsed == data
+    
+    def test_grouping_leaves_input_unchanged(self):
+        data = {"highlights": [{"page": 1}]}
+        result = _json.loads(format_json_output(data, group_by="page"))
+        assert result["grouped_highlights"] == {"1": [{"page": 1}]}
+        assert data == {"highlights": [{"page": 1}]}
+    
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_stdlib_fallback(self, monkeypatch, pretty):
+        data = {"text": "Hello 世界", "highlights": [{"page": 1, "color": [1.0, 1.0, 0.0]}]}
+        monkeypatch.setattr(utils, "orjson", None)
+        result = format_json_output(data, pretty=pretty, group_by="page")
+        assert "世界" in result
+        parsed = _json.loads(result)
+        assert parsed["highlights"] == data["highlights"]
+        assert parsed["grouped_highlights"] == {"1": data["highlights"]}
+    
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_orjson_matches_stdlib(self, monkeypatch, pretty):
+        pytest.importorskip("orjson")
+        data = {"text": "Hello 世界 🌍", "highlights": [{"page": 2, "rect": [1.5, 2.0, 3.0, 4.0]}]}
+        fast = format_json_output(data, pretty=pretty, group_by="color")
+        monkeypatch.setattr(utils, "orjson", None)
+        slow = format_json_output(data, pretty=pretty, group_by="color")
+        assert _json.loads(fast) == _json.loads(slow)
+        if pretty:
+            assert fast == slow
+    
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_backends_agree_on_awkward_values(self, monkeypatch, pretty):
+        pytest.importorskip("orjson")
+        data = {"highlights": [{1: "a", "big": 2**70, "floats": [0.1, 1e20, -2.5]}]}
+        fast = format_json_output(data, pretty=pretty)
+        monkeypatch.setattr(utils, "orjson", None)
+        slow = format_json_output(data, pretty=pretty)
+        # The stdlib parser, since orjson rejects ints wider than 64 bits
+        assert json.loads(fast) == json.loads(slow)
+        assert json.loads(fast)["highlights"][0]["1"] == "a"
+
+    @pytest.mark.parametrize("use_orjson", [False, True])
+    def test_bytes_match_string(self, monkeypatch, use_orjson):
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(utils, "orjson", None)
+        data = {"text": "Hello 世界 🌍", "highlights": [{"page": 1}]}
+        result = format_json_bytes(data, pretty=True, group_by="page")
+        assert isinstance(result, bytes)
+        assert result.decode('utf-8') == format_json_output(data, pretty=True, group_by="page")
+    
+    @pytest.mark.parametrize("use_orjson", [False, True])
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_file_matches_string(self, tmp_path, monkeypatch, use_orjson, pretty):
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(utils, "orjson", None)
+        data = {"text": "Hello 世界 🌍", "highlights": [{"page": 1, "color_name": "Red"}]}
+        output_file = tmp_path / "out.json"
+        format_json_to_file(data, output_file, pretty=pretty, group_by="color")
+        expected = format_json_output(data, pretty=pretty, group_by="color")
+        assert output_file.read_text(encoding='utf-8') == expected
 
 
 class TestValidatePdfFile:
     """Tests for PDF file validation."""
     
-    def test_nonexistent_file(self):
-        is_valid, error_msg = validate_pdf_file("/nonexistent/file.pdf")
+    @pytest.mark.parametrize("error,expected", [
+        (FileNotFoundError(errno.ENOENT, "No such file or directory"), "file not found"),
+        (PermissionError(errno.EACCES, "Permission denied"), "cannot access file"),
+        (NotADirectoryError(errno.ENOTDIR, "Not a directory"), "cannot access file"),
+        (ValueError("embedded null byte"), "invalid file path"),
+    ])
+    def test_stat_errors(self, monkeypatch, error, expected):
+        def raiser(path):
+            raise error
+        
+        monkeypatch.setattr(utils.os, "stat", raiser)
+        is_valid, error_msg = validate_pdf_file("/some/file.pdf")
         assert not is_valid
-        assert "not found" in error_msg.lower()
+        assert expected in error_msg.lower()
     
-    def test_non_pdf_extension(self, tmp_path):
-        # Create a temporary non-PDF file
-        temp_file = tmp_path / "test.txt"
-        temp_file.write_text("not a pdf")
-        
-        is_valid, error_msg = validate_pdf_file(str(temp_file))
+    def test_non_pdf_extension(self, monkeypatch):
+        monkeypatch.setattr(utils.os, "stat", lambda path: _stat_result(stat.S_IFREG | 0o644))
+        is_valid, error_msg = validate_pdf_file("/some/test.txt")
         assert not is_valid
         assert "not a pdf" in error_msg.lower()
     
-    def test_directory_instead_of_file(self, tmp_path):
-        is_valid, error_msg = validate_pdf_file(str(tmp_path))
+    def test_directory_instead_of_file(self, monkeypatch):
+        monkeypatch.setattr(utils.os, "stat", lambda path: _stat_result(stat.S_IFDIR | 0o755))
+        is_valid, error_msg = validate_pdf_file("/some/dir.pdf")
         assert not is_valid
         assert "not a file" in error_msg.lower()
     
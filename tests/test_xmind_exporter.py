@@ -1,120 +1,136 @@
 """Tests for XMind export functionality."""
 
-import json
+import io
 import zipfile
 from pathlib import Path
+from types import MappingProxyType
 from unittest.mock import Mock, patch
 
 import pytest
 
-from src.xmind_exporter import XMindExporter, export_to_xmind
+try:
+    import orjson as _json  # Parses the archive's bytes directly, and faster
+except ImportError:
+    import json as _json
+
+from src import xmind_exporter
+from src.xmind_exporter import ID_POOL_SIZE, XMindExporter, export_to_xmind
+
+
+@pytest.fixture(scope="session")
+def sample_data():
+    """Sample extraction result, shared read-only by every test in the module."""
+    return MappingProxyType({
+        'source_file': 'test.pdf',
+        'source_path': '/path/to/test.pdf',
+        'extraction_date': '2026-01-31T21:00:00Z',
+        'total_pages': 2,
+        'total_highlights': 3,
+        'highlights': [
+            {
+                'page': 1,
+                'text': 'First highlight',
+                'color': [1.0, 1.0, 0.0],
+                'color_name': 'Yellow',
+                'rect': [100, 200, 300, 220],
+                'author': 'Test User',
+                'created': 'D:20260131210000'
+            },
+            {
+                'page': 1,
+                'text': 'Second highlight',
+                'color': [1.0, 0.0, 0.0],
+                'color_name': 'Red',
+                'rect': [100, 250, 300, 270],
+                'author': None,
+                'created': None
+            },
+            {
+                'page': 2,
+                'text': 'Third highlight',
+                'color': [0.0, 1.0, 0.0],
+                'color_name': 'Green',
+                'rect': [50, 150, 400, 170],
+                'author': None,
+                'created': None
+            }
+        ]
+    })
+
+
+def _read_xmind(source) -> dict[str, bytes]:
+    """Read every entry of an XMind archive (path or binary stream) in one pass."""
+    with zipfile.ZipFile(source, 'r') as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def stored_zip():
+    """Store this module's archives uncompressed; the tests only round-trip their JSON."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(XMindExporter, "_compression", zipfile.ZIP_STORED)
+        yield
+
+
+@pytest.fixture(scope="module")
+def tmp_dir(tmp_path_factory):
+    """One directory for the few tests that write real files; names must be unique."""
+    return tmp_path_factory.mktemp("xmind")
+
+
+def _export_to_memory(exporter: XMindExporter, group_by: str = 'page', **kwargs) -> io.BytesIO:
+    """Export into an in-memory buffer, rewound for reading."""
+    buffer = io.BytesIO()
+    exporter.export(buffer, group_by=group_by, **kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture(scope="module")
+def exported_xmind(sample_data, stored_zip):
+    """Export the sample data once per grouping and parse the archive entries."""
+    exported = {}
+    for group_by in ("page", "color"):
+        archive = _export_to_memory(XMindExporter(sample_data), group_by)
+        entries = _read_xmind(archive)
+        exported[group_by] = {
+            "archive": archive,
+            "content": _json.loads(entries['content.json']),
+            "manifest": _json.loads(entries['manifest.json']),
+            "metadata": _json.loads(entries['metadata.json']),
+        }
+    return exported
 
 
 class TestXMindExporter:
     """Tests for XMindExporter class."""
     
-    def setup_method(self):
-        """Set up test data."""
-        self.sample_data = {
-            'source_file': 'test.pdf',
-            'source_path': '/path/to/test.pdf',
-            'extraction_date': '2026-01-31T21:00:00Z',
-            'total_pages': 2,
-            'total_highlights': 3,
-            'highlights': [
-                {
-                    'page': 1,
-                    'text': 'First highlight',
-                    'color': [1.0, 1.0, 0.0],
-                    'color_name': 'Yellow',
-                    'rect': [100, 200, 300, 220],
-                    'author': 'Test User',
-                    'created': 'D:20260131210000'
-                },
-                {
-                    'page': 1,
-                    'text': 'Second highlight',
-                    'color': [1.0, 0.0, 0.0],
-                    'color_name': 'Red',
-                    'rect': [100, 250, 300, 270],
-                    'author': None,
-                    'created': None
-                },
-                {
-                    'page': 2,
-                    'text': 'Third highlight',
-                    'color': [0.0, 1.0, 0.0],
-                    'color_name': 'Green',
-                    'rect': [50, 150, 400, 170],
-                    'author': None,
-                    'created': None
-                }
-            ]
-        }
+    def test_export_creates_valid_zip(self, exported_xmind):
+        """Test that export creates a valid ZIP file with the required files."""
+        with zipfile.ZipFile(exported_xmind['page']['archive'], 'r') as zf:
+            assert zf.testzip() is None
+            # The shared export was made under stored_zip, not deflated
+            assert zf.getinfo('content.json').compress_type == zipfile.ZIP_STORED
+            assert {'content.json', 'manifest.json', 'metadata.json'} <= set(zf.namelist())
     
-    def test_export_creates_valid_zip(self, tmp_path):
-        """Test that export creates a valid ZIP file."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='page')
+    @pytest.mark.parametrize("group_by,expected_titles", [
+        ("page", {"Page 1", "Page 2"}),
+        ("color", {"Yellow", "Red", "Green"}),
+    ])
+    def test_export_structure(self, exported_xmind, group_by, expected_titles):
+        """Test export organized by page or by color."""
+        content = exported_xmind[group_by]['content']
         
-        assert output_file.exists()
-        assert zipfile.is_zipfile(output_file)
+        # Root topic title should be filename stem
+        sheet = content[0]
+        root_topic = sheet['rootTopic']
+        assert root_topic['title'] == 'test'
+        
+        # Top-level topics are the page numbers or the color names
+        titles = {t['title'] for t in root_topic['children']['attached']}
+        assert expected_titles <= titles
     
-    def test_export_contains_required_files(self, tmp_path):
-        """Test that ZIP contains required files."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='page')
-        
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            names = zf.namelist()
-            assert 'content.json' in names
-            assert 'manifest.json' in names
-            assert 'metadata.json' in names
-    
-    def test_export_by_page_structure(self, tmp_path):
-        """Test export organized by page."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='page')
-        
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            content_json = zf.read('content.json').decode('utf-8')
-            content = json.loads(content_json)
-            
-            # Root topic title should be filename stem
-            sheet = content[0]
-            root_topic = sheet['rootTopic']
-            assert root_topic['title'] == 'test'
-            
-            # Check structure
-            attached = root_topic['children']['attached']
-            # Should have page topics
-            page_topics = [t for t in attached if t['title'].startswith('Page ')]
-            assert len(page_topics) > 0
-    
-    def test_export_by_color_structure(self, tmp_path):
-        """Test export organized by color."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='color')
-        
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            content_json = zf.read('content.json').decode('utf-8')
-            content = json.loads(content_json)
-            
-            sheet = content[0]
-            root_topic = sheet['rootTopic']
-            attached = root_topic['children']['attached']
-            
-            # Should contain color names in the topics
-            titles = [t['title'] for t in attached]
-            assert 'Yellow' in titles
-            assert 'Red' in titles
-            assert 'Green' in titles
-    
-    def test_export_empty_highlights(self, tmp_path):
+    def test_export_empty_highlights(self):
         """Test export with no highlights."""
         empty_data = {
             'source_file': 'empty.pdf',
@@ -125,22 +141,17 @@ class TestXMindExporter:
             'highlights': []
         }
         
-        output_file = tmp_path / "empty.xmind"
-        exporter = XMindExporter(empty_data)
-        exporter.export(str(output_file), group_by='page')
+        archive = _export_to_memory(XMindExporter(empty_data), 'page')
+        content = _json.loads(_read_xmind(archive)['content.json'])
         
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            content_json = zf.read('content.json').decode('utf-8')
-            content = json.loads(content_json)
-            
-            sheet = content[0]
-            root_topic = sheet['rootTopic']
-            attached = root_topic['children']['attached']
-            assert any(t['title'] == 'No highlights found' for t in attached)
+        sheet = content[0]
+        root_topic = sheet['rootTopic']
+        attached = root_topic['children']['attached']
+        assert any(t['title'] == 'No highlights found' for t in attached)
     
-    def test_create_metadata_text(self):
+    def test_create_metadata_text(self, sample_data):
         """Test metadata text generation."""
-        exporter = XMindExporter(self.sample_data)
+        exporter = XMindExporter(sample_data)
         metadata = exporter._create_metadata_text()
         
         assert 'Total Pages: 2' in metadata
@@ -149,63 +160,132 @@ class TestXMindExporter:
         assert '/path/to/test.pdf' in metadata
     
     
-    def test_invalid_group_by(self):
+    def test_invalid_group_by(self, sample_data):
         """Test that invalid group_by raises error."""
-        exporter = XMindExporter(self.sample_data)
+        exporter = XMindExporter(sample_data)
         
         with pytest.raises(ValueError, match="Invalid group_by option"):
             exporter.export('test.xmind', group_by='invalid')
     
-    def test_generate_id_unique(self):
+    @pytest.mark.parametrize("compresslevel", [1, 9])
+    def test_export_compresslevel(self, sample_data, monkeypatch, compresslevel):
+        """Test that any deflate level produces the same archive contents."""
+        # Undo stored_zip: this test is about the real compression
+        monkeypatch.setattr(XMindExporter, "_compression", zipfile.ZIP_DEFLATED)
+        archive = _export_to_memory(XMindExporter(sample_data), 'page', compresslevel=compresslevel)
+        
+        with zipfile.ZipFile(archive, 'r') as zf:
+            assert zf.testzip() is None
+            compress_types = {i.filename: i.compress_type for i in zf.infolist()}
+            assert compress_types == {
+                'content.json': zipfile.ZIP_DEFLATED,
+                'manifest.json': zipfile.ZIP_STORED,
+                'metadata.json': zipfile.ZIP_STORED,
+            }
+            assert _json.loads(zf.read('content.json'))[0]['class'] == 'sheet'
+    
+    def test_generate_id_unique(self, sample_data):
         """Test that generated IDs are unique."""
-        exporter = XMindExporter(self.sample_data)
+        exporter = XMindExporter(sample_data)
+        
+        ids = [exporter._generate_id() for _ in range(10_000)]
+        
+        assert len(set(ids)) == 10_000
+        assert all(len(i) == 16 for i in ids)
+    
+    def test_generate_id_refills_pool(self, sample_data):
+        """Test that IDs stay unique and hex across pool refills."""
+        exporter = XMindExporter(sample_data)
+        
+        ids = [exporter._generate_id() for _ in range(ID_POOL_SIZE * 2 + 1)]
+        
+        assert len(set(ids)) == len(ids)
+        assert all(len(i) == 16 and int(i, 16) >= 0 for i in ids)
+    
+    @pytest.mark.parametrize("use_orjson", [False, True])
+    @pytest.mark.parametrize("pretty", [False, True])
+    @pytest.mark.parametrize("group_by", ["page", "color"])
+    def test_streamed_content_matches_structure(
+        self, sample_data, monkeypatch, group_by, pretty, use_orjson
+    ):
+        """Test that the streamed content.json matches the in-memory structure."""
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(xmind_exporter, "orjson", None)
+        exporter = XMindExporter(sample_data, pretty=pretty)
         
-        id1 = exporter._generate_id()
-        id2 = exporter._generate_id()
+        with patch.object(XMindExporter, '_generate_id', side_effect=map(str, range(100))):
+            archive = _export_to_memory(exporter, group_by)
+        with patch.object(XMindExporter, '_generate_id', side_effect=map(str, range(100))):
+            expected = exporter._create_content(group_by)
         
-        assert id1 != id2
-        assert len(id1) == 16
-        assert len(id2) == 16
+        raw = _read_xmind(archive)['content.json']
+        assert _json.loads(raw) == expected
+        assert (b'\n  ' in raw) == pretty
     
-    def test_json_structure_valid(self, tmp_path):
+    @pytest.mark.parametrize("group_by", ["page", "color"])
+    def test_json_structure_valid(self, exported_xmind, group_by):
         """Test that generated JSON is valid."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='page')
-        
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            content_json = zf.read('content.json').decode('utf-8')
-            manifest_json = zf.read('manifest.json').decode('utf-8')
-            
-            # Should be valid JSON
-            content = json.loads(content_json)
-            manifest = json.loads(manifest_json)
-            
-            assert isinstance(content, list)
-            assert isinstance(manifest, dict)
-    
-    def test_metadata_json_structure(self, tmp_path):
+        # Parsed by the fixture, so it is valid JSON
+        assert isinstance(exported_xmind[group_by]['content'], list)
+        assert isinstance(exported_xmind[group_by]['manifest'], dict)
+    
+    def test_metadata_json_structure(self, exported_xmind):
         """Test metadata.json structure."""
-        output_file = tmp_path / "test.xmind"
-        exporter = XMindExporter(self.sample_data)
-        exporter.export(str(output_file), group_by='page')
+        metadata = exported_xmind['page']['metadata']
         
-        with zipfile.ZipFile(output_file, 'r') as zf:
-            metadata_json = zf.read('metadata.json').decode('utf-8')
-            metadata = json.loads(metadata_json)
-            
-            assert 'creator' in metadata
-            assert 'name' in metadata['creator']
-            assert 'version' in metadata['creator']
-            # created/time might vary in format/key depending on implementation details
+        assert 'creator' in metadata
+        assert 'name' in metadata['creator']
+        assert 'version' in metadata['creator']
+        # created/time might vary in format/key depending on implementation details
+    
+    @pytest.mark.parametrize("use_orjson", [False, True])
+    def test_preserialized_files_match_dicts(self, sample_data, monkeypatch, use_orjson):
+        """Test that the constant manifest/metadata bytes encode the same dicts."""
+        if use_orjson:
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(xmind_exporter, "orjson", None)
+        exporter = XMindExporter(sample_data)
+        entries = _read_xmind(_export_to_memory(exporter, 'page'))
+        assert entries['manifest.json'] == exporter._encode(exporter._create_manifest())
+        assert entries['metadata.json'] == exporter._encode(exporter._create_metadata())
+    
+    @pytest.mark.parametrize("pretty", [False, True])
+    def test_created_defaults_to_now_once(self, sample_data, pretty):
+        """Test that a missing extraction date reads the clock once per export."""
+        data = {k: v for k, v in sample_data.items() if k != 'extraction_date'}
+        with patch.object(xmind_exporter, "datetime") as mock_datetime:
+            mock_datetime.now.return_value.isoformat.return_value = "2026-02-01T10:00:00"
+            archive = _export_to_memory(XMindExporter(data, pretty=pretty), 'page')
+        
+        assert mock_datetime.now.call_count == 1
+        metadata = _json.loads(_read_xmind(archive)['metadata.json'])
+        assert metadata['created'] == "2026-02-01T10:00:00"
+    
+    def test_export_to_stream(self, sample_data, tmp_dir):
+        """Test that exporting into a binary stream matches exporting to a file."""
+        buffer = io.BytesIO()
+        XMindExporter(sample_data).export(buffer, group_by='page')
+        
+        output_file = tmp_dir / "test_export_to_stream.xmind"
+        XMindExporter(sample_data).export(output_file, group_by='page')
+        
+        buffer.seek(0)
+        streamed = _read_xmind(buffer)
+        saved = _read_xmind(output_file)
+        assert list(streamed) == list(saved)
+        assert streamed['manifest.json'] == saved['manifest.json']
+        assert _json.loads(streamed['content.json'])[0]['rootTopic']['title'] == 'test'
     
     
 class TestExportToXmind:
     """Tests for convenience function."""
     
-    def test_convenience_function(self, tmp_path):
+    def test_convenience_function(self, tmp_dir):
         """Test that convenience function works correctly."""
-        output_file = tmp_path / "output.xmind"
+        output_file = tmp_dir / "test_convenience_function.xmind"
         test_data = {
             'source_file': 'test.pdf',
             'total_pages': 1,
@@ -218,9 +298,9 @@ class TestExportToXmind:
         assert output_file.exists()
         assert zipfile.is_zipfile(output_file)
     
-    def test_convenience_function_with_color(self, tmp_path):
+    def test_convenience_function_with_color(self):
         """Test convenience function with color grouping."""
-        output_file = tmp_path / "output.xmind"
+        output_file = io.BytesIO()
         test_data = {
             'source_file': 'test.pdf',
             'total_pages': 1,
@@ -228,6 +308,6 @@ class TestExportToXmind:
             'highlights': []
         }
         
-        export_to_xmind(test_data, str(output_file), group_by='color')
+        export_to_xmind(test_data, output_file, group_by='color')
         
-        assert output_file.exists()
+        assert zipfile.is_zipfile(output_file)